@@ -4,3 +4,16 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_save
+
+        from api.authentication import invalidate_cached_user
+        from api.metrics import install_query_counter
+        from reviews.models import User
+
+        # Запросы считаются и в потоках, открывающих свои соединения.
+        connection_created.connect(install_query_counter)
+        post_save.connect(invalidate_cached_user, sender=User)
+        post_delete.connect(invalidate_cached_user, sender=User)
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+ASYNC_READ_ROUTES = (
+    'titles-list', 'titles-detail', 'reviews-list', 'comments-list',
+)
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+read_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_READ_WORKERS,
+    thread_name_prefix='async-read',
+)
+
+
+def run_read(view, request, *args, **kwargs):
+    """Выполняет представление и отрисовывает ответ в потоке пула.
+
+    У каждого потока пула своё соединение с базой; устаревшие
+    соединения закрываются так же, как в начале и в конце запроса.
+    """
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обёртка над представлением DRF.
+
+    Анонимные чтения выполняются в отдельном пуле потоков и не ждут
+    общего потока, в котором ASGI исполняет синхронные представления.
+    Ответ формирует то же представление, поэтому JSON не отличается.
+    Запись и запросы с токеном идут обычным синхронным путём.
+    """
+    read = sync_to_async(
+        run_read, thread_sensitive=False, executor=read_executor
+    )
+    write = sync_to_async(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if (
+            request.method in SAFE_METHODS
+            and 'HTTP_AUTHORIZATION' not in request.META
+        ):
+            return await read(view, request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    return wrapper
+
+
+def with_async_reads(urlpatterns, names=ASYNC_READ_ROUTES):
+    """Подменяет представления маршрутов names асинхронными обёртками."""
+    return [
+        URLPattern(
+            pattern.pattern, async_read_view(pattern.callback),
+            pattern.default_args, pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in urlpatterns
+    ]
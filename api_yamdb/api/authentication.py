@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (
+    AuthenticationFailed,
+    InvalidToken,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from reviews.models import User
+
+# Поля, которых хватает разрешениям и для привязки автора к объекту.
+# Порядок должен совпадать с порядком полей модели: этого требует from_db.
+CACHED_USER_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in {
+        'id', 'username', 'role', 'is_active', 'is_staff', 'is_superuser'
+    }
+)
+
+
+class UserCache:
+    """Ограниченный по размеру LRU-кэш пользователей с временем жизни.
+
+    Кэш живёт в памяти процесса. Сохранение и удаление пользователя
+    сбрасывают запись через сигналы (см. invalidate_cached_user), но только
+    в том процессе, где это произошло: в остальных новая роль или
+    блокировка вступает в силу не позже чем через ttl секунд. Поэтому
+    JWT_USER_CACHE_TTL держится коротким.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None:
+                return None
+            expires, values = item
+            if expires < monotonic():
+                del self._data[user_id]
+                return None
+            self._data.move_to_end(user_id)
+            return values
+
+    def set(self, user_id, values):
+        with self._lock:
+            self._data[user_id] = (monotonic() + self.ttl, values)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._data.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = UserCache(
+    max_size=settings.JWT_USER_CACHE_MAX_SIZE,
+    ttl=settings.JWT_USER_CACHE_TTL,
+)
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Обработчик post_save и post_delete пользователя.
+
+    Запись сбрасывается после фиксации транзакции: иначе параллельный
+    запрос успел бы снова закэшировать ещё не изменённую строку.
+    Изменения через QuerySet.update() сигналов не посылают.
+    """
+    user_id = instance.pk
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без запроса к таблице пользователей.
+
+    Роль и флаги пользователя берутся из user_cache. Возвращается экземпляр
+    User, в котором загружены только CACHED_USER_FIELDS: остальные поля
+    при обращении подгружаются из базы, а save() сохраняет лишь
+    загруженные поля.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+
+        values = user_cache.get(user_id)
+        if values is None:
+            values = self.user_model.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*CACHED_USER_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed(
+                    _('User not found'), code='user_not_found'
+                )
+            user_cache.set(user_id, values)
+
+        user = self.user_model.from_db(
+            DEFAULT_DB_ALIAS, CACHED_USER_FIELDS, values
+        )
+        if not user.is_active:
+            raise AuthenticationFailed(
+                _('User is inactive'), code='user_inactive'
+            )
+        return user
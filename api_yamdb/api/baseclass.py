@@ -1,7 +1,20 @@
-from rest_framework import filters, mixins, viewsets
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+from rest_framework import filters, mixins, status, viewsets
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
 from api.permissions import IsAdminOrReadOnly
+from api.snapshots import snapshots
+from api.title_cache import title_cache
+from reviews.models import User
 
 
 class CategoryGenreBaseViewSet(
@@ -10,10 +23,245 @@ class CategoryGenreBaseViewSet(
         mixins.ListModelMixin,
         mixins.DestroyModelMixin
 ):
-    """Базовое представление для Category и Genre."""
+    """Базовое представление для Category и Genre.
+
+    Список отдаётся из снимка в памяти, который пересобирается только
+    после создания или удаления объекта. Ответ содержит ETag, и по
+    If-None-Match возвращается 304 без обращения к базе.
+    """
     permission_classes = (IsAdminOrReadOnly,)
     lookup_field = 'slug'
     pagination_class = LimitOffsetPagination
     filter_backends = (filters.SearchFilter,)
     filterset_fields = ('category', 'genre', 'name', 'year')
     search_fields = ('name',)
+
+    @property
+    def snapshot_label(self):
+        return self.queryset.model._meta.label_lower
+
+    def build_snapshot(self):
+        return self.get_serializer(self.queryset.all(), many=True).data
+
+    def filter_snapshot(self, items):
+        terms = [
+            term.casefold()
+            for term in filters.SearchFilter().get_search_terms(self.request)
+        ]
+        if not terms:
+            return items
+        return [
+            item for item in items
+            if all(term in item['name'].casefold() for term in terms)
+        ]
+
+    def list(self, request, *args, **kwargs):
+        snapshot = snapshots.get(self.snapshot_label, self.build_snapshot)
+        etag = snapshot.etag(request.query_params)
+        if_none_match = parse_etags(
+            request.META.get('HTTP_IF_NONE_MATCH', '')
+        )
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            items = self.filter_snapshot(snapshot.items)
+            page = self.paginate_queryset(items)
+            if page is not None:
+                response = self.get_paginated_response(page)
+            else:
+                response = Response(items)
+        response['ETag'] = etag
+        return response
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        snapshots.invalidate(self.snapshot_label)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # Произведения с этой категорией или жанром изменят
+            # представление; их список нужен до удаления связей.
+            title_ids = list(instance.titles.values_list('pk', flat=True))
+            super().perform_destroy(instance)
+            title_cache.invalidate(titles=title_ids, lists=True)
+        snapshots.invalidate(self.snapshot_label)
+
+
+class ParentLookupMixin:
+    """Родительский объект вложенного ресурса (отзыва, комментария).
+
+    Родитель загружается не больше одного раза за запрос. Список его
+    не загружает вовсе: дочерние объекты фильтруются по id из URL,
+    а существование родителя проверяется, только если страница пуста.
+    """
+
+    def get_parent_queryset(self):
+        raise NotImplementedError
+
+    def get_parent(self):
+        if not hasattr(self, '_parent'):
+            self._parent = get_object_or_404(self.get_parent_queryset())
+        return self._parent
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        results = response.data
+        if isinstance(results, dict):
+            results = results.get('results')
+        if not results and not self.get_parent_queryset().exists():
+            raise Http404
+        return response
+
+
+class BulkCreateView(APIView):
+    """Пакетное создание объектов с результатом по каждому элементу.
+
+    Тело запроса — список объектов длиной не больше BULK_MAX_ITEMS.
+    Родители и авторы всей пачки загружаются одним запросом, объекты
+    создаются в одной транзакции. Ошибка в одном элементе не мешает
+    остальным: для каждого возвращается статус и объект либо ошибки.
+    Указывать автора явно может только администратор.
+    """
+    permission_classes = (IsAuthenticated,)
+    model = None
+    item_serializer_class = None
+    serializer_class = None
+    parent_field = None
+    parent_not_found = None
+    conflict_message = (
+        'Элемент конфликтует с данными, изменившимися во время загрузки.'
+    )
+
+    def get_parent_queryset(self):
+        raise NotImplementedError
+
+    def fail(self, items, errors, index, field, message):
+        items.pop(index)
+        errors[index] = {field: [message]}
+
+    def resolve_parents(self, items, errors):
+        parents = self.get_parent_queryset().in_bulk(
+            {item[self.parent_field] for item in items.values()}
+        )
+        for index, item in list(items.items()):
+            parent = parents.get(item[self.parent_field])
+            if parent is None:
+                self.fail(
+                    items, errors, index,
+                    self.parent_field, self.parent_not_found
+                )
+            else:
+                item[self.parent_field] = parent
+
+    def resolve_authors(self, items, errors):
+        usernames = {
+            item['author'] for item in items.values() if 'author' in item
+        }
+        is_admin = self.request.user.is_admin
+        authors = (
+            User.objects.in_bulk(usernames, field_name='username')
+            if usernames and is_admin else {}
+        )
+        for index, item in list(items.items()):
+            if 'author' not in item:
+                item['author'] = self.request.user
+            elif not is_admin:
+                self.fail(
+                    items, errors, index, 'author',
+                    'Указывать автора может только администратор.'
+                )
+            elif item['author'] not in authors:
+                self.fail(
+                    items, errors, index, 'author', 'Пользователь не найден.'
+                )
+            else:
+                item['author'] = authors[item['author']]
+
+    def check_items(self, items, errors):
+        """Проверки, которым нужна вся пачка сразу."""
+
+    def perform_bulk_create(self, objs):
+        """Сохраняет объекты в текущей транзакции.
+
+        Если база возвращает ключи вставленных строк (PostgreSQL), пачка
+        вставляется одним bulk_create. Иначе объекты сохраняются по
+        одному: без ключей их нечем вернуть в ответе.
+        """
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.model.objects.bulk_create(objs)
+            return
+        for obj in objs:
+            obj.save(force_insert=True)
+
+    def create_objects(self, objs, errors):
+        """Создаёт объекты; отвергнутые базой элементы получают ошибку.
+
+        Сначала вся пачка сохраняется одной транзакцией. Если база
+        отвергла строку (данные изменились после проверок), пачка
+        повторяется по одному объекту, каждый в своей точке сохранения,
+        и ошибка достаётся только конфликтующим элементам.
+        """
+        try:
+            with transaction.atomic():
+                self.perform_bulk_create(list(objs.values()))
+            return
+        except IntegrityError:
+            pass
+        for obj in objs.values():
+            obj.pk = None
+        with transaction.atomic():
+            for index, obj in list(objs.items()):
+                try:
+                    with transaction.atomic():
+                        self.perform_bulk_create([obj])
+                except IntegrityError:
+                    del objs[index]
+                    obj.pk = None
+                    errors[index] = {
+                        api_settings.NON_FIELD_ERRORS_KEY: [
+                            self.conflict_message
+                        ]
+                    }
+
+    def post(self, request, *args, **kwargs):
+        data = request.data
+        if not isinstance(data, list) or not data:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'Ожидается непустой список объектов.'
+            ]})
+        if len(data) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                'За один запрос можно передать не больше '
+                f'{settings.BULK_MAX_ITEMS} объектов.'
+            ]})
+        items, errors = {}, {}
+        for index, item in enumerate(data):
+            serializer = self.item_serializer_class(data=item)
+            if serializer.is_valid():
+                items[index] = dict(serializer.validated_data)
+            else:
+                errors[index] = serializer.errors
+        if items:
+            self.resolve_parents(items, errors)
+        if items:
+            self.resolve_authors(items, errors)
+        if items:
+            self.check_items(items, errors)
+        objs = {index: self.model(**item) for index, item in items.items()}
+        if objs:
+            self.create_objects(objs, errors)
+        results = [
+            {
+                'status': status.HTTP_400_BAD_REQUEST,
+                'errors': errors[index],
+            } if index in errors else {
+                'status': status.HTTP_201_CREATED,
+                'data': self.serializer_class(objs[index]).data,
+            }
+            for index in range(len(data))
+        ]
+        return Response(
+            results,
+            status=(status.HTTP_207_MULTI_STATUS if errors
+                    else status.HTTP_201_CREATED)
+        )
@@ -4,19 +4,18 @@ from reviews.models import Title
 
 
 class TitleFilter(FilterSet):
-    genre = CharFilter(
-        field_name='genre__slug',
-        lookup_expr='icontains'
-    )
-    category = CharFilter(
-        field_name='category__slug',
-        lookup_expr='icontains'
-    )
-    name = CharFilter(
-        field_name='name',
-        lookup_expr='icontains'
-    )
+    genre = CharFilter(field_name='genre__slug')
+    category = CharFilter(field_name='category__slug')
+    name = CharFilter(method='filter_name')
+    search = CharFilter(method='filter_search')
 
     class Meta:
         model = Title
         fields = ['genre', 'category', 'name', 'year']
+
+    def filter_name(self, queryset, name, value):
+        return queryset.search(value, column='name')
+
+    def filter_search(self, queryset, name, value):
+        """Поиск по названию и описанию, сначала самые релевантные."""
+        return queryset.search(value).order_by('-search_rank', 'name')
@@ -0,0 +1,711 @@
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from statistics import quantiles
+from time import perf_counter
+
+import django
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import URLResolver, reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api import urls
+from api.authentication import user_cache
+from api.management.datagen import (
+    WORDS,
+    BulkInserter,
+    create_catalog,
+    create_users,
+    words,
+)
+from api.snapshots import snapshots
+from api.title_cache import title_cache
+from reviews.models import (
+    Category,
+    Comment,
+    Genre,
+    Review,
+    Title,
+    TitleGenre,
+    User,
+    UserRole,
+)
+
+BATCH_SIZE = 1000
+BULK_ITEMS = 10
+
+
+def pick(values, index):
+    return values[index % len(values)]
+
+
+def percentiles(latencies):
+    """p50, p95 и p99 в миллисекундах."""
+    points = (
+        quantiles(latencies, n=100, method='inclusive')
+        if len(latencies) > 1 else latencies * 99
+    )
+    return {
+        f'p{rank}_ms': points[rank - 1] * 1000 for rank in (50, 95, 99)
+    }
+
+
+def route_names(patterns):
+    """Имена всех маршрутов, включая вложенные через include()."""
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, check=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def reset_caches():
+    """Кэши процесса не должны пережить смену содержимого базы."""
+    title_cache.invalidate(everything=True)
+    snapshots.clear()
+    user_cache.clear()
+
+
+class Scenario:
+    """Замеряемый запрос к одному маршруту.
+
+    build(i) готовит i-й запрос и возвращает (путь, данные); подготовка
+    в замер не входит. cleanup(response), если задан, убирает созданное
+    запросом, тоже вне замера.
+    """
+
+    def __init__(self, route, method, client, build, cleanup=None,
+                 variant=''):
+        self.route = route
+        self.method = method
+        self.client = client
+        self.build = build
+        self.cleanup = cleanup
+        self.variant = variant
+
+    @property
+    def label(self):
+        return f'{self.method} {self.route}{self.variant}'
+
+    def send(self, path, data):
+        send = getattr(self.client, self.method.lower())
+        if self.method == 'GET':
+            return send(path, data)
+        return send(path, data, content_type='application/json')
+
+
+class ScenarioBuilder:
+    """Сценарии замера, по методу на ресурс.
+
+    Создаёт администратора и автора, от имени которых идут запросы;
+    data — ключи объектов, созданных Command.seed.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        admin = User.objects.create(
+            username='bench_admin', email='admin@bench.local',
+            role=UserRole.ADMIN,
+        )
+        self.author = User.objects.create(
+            username='bench_author', email='author@bench.local'
+        )
+        self.anonymous = Client(raise_request_exception=False)
+        self.admin_client, self.user_client = (
+            Client(
+                raise_request_exception=False,
+                HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}',
+            )
+            for user in (admin, self.author)
+        )
+
+    @staticmethod
+    def url(route, **kwargs):
+        return reverse(f'api:{route}', kwargs=kwargs)
+
+    @staticmethod
+    def get(path, params=None):
+        return lambda i: (path(i) if callable(path) else path, params)
+
+    @staticmethod
+    def created(client, list_path, data):
+        """Создаёт объект вне замера и возвращает его данные."""
+        response = client.post(
+            list_path, data, content_type='application/json'
+        )
+        if response.status_code != 201:
+            raise CommandError(
+                f'Не удалось подготовить данные для {list_path}: '
+                f'{response.status_code} {response.content[:200]}'
+            )
+        return response.json()
+
+    def deleting(self, client, detail_route, **lookup):
+        """cleanup: удаляет созданный запросом объект через API."""
+        def cleanup(response):
+            if response.status_code == 201:
+                body = response.json()
+                client.delete(self.url(detail_route, **{
+                    kwarg: value(body) for kwarg, value in lookup.items()
+                }))
+        return cleanup
+
+    def remove_author_reviews(self, response):
+        reviews = Review.objects.filter(author=self.author)
+        changed = list(reviews.values_list('title_id', flat=True))
+        reviews.delete()
+        Title.objects.filter(pk__in=changed).recalculate_rating()
+        title_cache.invalidate(titles=changed)
+
+    def remove_author_comments(self, response):
+        Comment.objects.filter(author=self.author).delete()
+
+    def auth(self):
+        author = self.author
+        return [
+            Scenario('signup', 'POST', self.anonymous, lambda i: (
+                self.url('signup'),
+                {'username': f'bench_signup_{i}',
+                 'email': f'signup{i}@bench.local'},
+            )),
+            Scenario('token', 'POST', self.anonymous, lambda i: (
+                self.url('token'),
+                {'username': author.username,
+                 'confirmation_code':
+                     default_token_generator.make_token(author)},
+            )),
+        ]
+
+    def titles(self):
+        url, get, data = self.url, self.get, self.data
+        titles, admin_client = data['titles'], self.admin_client
+
+        def title_url(i):
+            return url('titles-detail', pk=pick(titles, i))
+
+        def title_data(i):
+            return {
+                'name': f'Новое произведение {i}',
+                'year': 2000,
+                'genre': [pick(data['genres'], i)],
+                'category': pick(data['categories'], i),
+            }
+
+        def delete_title(i):
+            body = self.created(
+                admin_client, url('titles-list'), title_data(i)
+            )
+            return url('titles-detail', pk=body['id']), {}
+
+        return [
+            Scenario(
+                'titles-list', 'GET', self.anonymous, get(url('titles-list'))
+            ),
+            Scenario(
+                'titles-list', 'GET', self.user_client,
+                get(url('titles-list')), variant=' (с токеном)',
+            ),
+            Scenario(
+                'titles-list', 'GET', self.user_client,
+                get(url('titles-list'), {'genre': data['genres'][0]}),
+                variant=' ?genre',
+            ),
+            Scenario(
+                'titles-list', 'GET', self.user_client,
+                get(url('titles-list'), {'search': WORDS[0]}),
+                variant=' ?search',
+            ),
+            Scenario(
+                'titles-list', 'POST', admin_client,
+                lambda i: (url('titles-list'), title_data(i)),
+                self.deleting(
+                    admin_client, 'titles-detail', pk=lambda b: b['id']
+                ),
+            ),
+            Scenario('titles-detail', 'GET', self.anonymous, get(title_url)),
+            Scenario('titles-detail', 'PATCH', admin_client, lambda i: (
+                title_url(i), {'description': f'Описание {i}'},
+            )),
+            Scenario('titles-detail', 'DELETE', admin_client, delete_title),
+        ]
+
+    def catalog(self):
+        url, admin_client = self.url, self.admin_client
+
+        def delete_slug(route):
+            def build(i):
+                slug = f'bench-delete-{route}-{i}'
+                self.created(
+                    admin_client, url(f'{route}-list'),
+                    {'name': slug, 'slug': slug},
+                )
+                return url(f'{route}-detail', slug=slug), {}
+            return build
+
+        return [
+            Scenario(
+                'categories-list', 'GET', self.anonymous,
+                self.get(url('categories-list')),
+            ),
+            Scenario('categories-list', 'POST', admin_client, lambda i: (
+                url('categories-list'),
+                {'name': f'Новая категория {i}', 'slug': f'bench-new-{i}'},
+            ), self.deleting(
+                admin_client, 'categories-detail', slug=lambda b: b['slug']
+            )),
+            Scenario(
+                'categories-detail', 'DELETE', admin_client,
+                delete_slug('categories'),
+            ),
+            Scenario(
+                'genres-list', 'GET', self.anonymous,
+                self.get(url('genres-list')),
+            ),
+            Scenario('genres-list', 'POST', admin_client, lambda i: (
+                url('genres-list'),
+                {'name': f'Новый жанр {i}', 'slug': f'bench-new-{i}'},
+            ), self.deleting(
+                admin_client, 'genres-detail', slug=lambda b: b['slug']
+            )),
+            Scenario(
+                'genres-detail', 'DELETE', admin_client,
+                delete_slug('genres'),
+            ),
+        ]
+
+    def reviews(self):
+        url, get = self.url, self.get
+        titles, reviews = self.data['titles'], self.data['reviews']
+
+        def reviews_url(i):
+            return url('reviews-list', title_id=pick(titles, i))
+
+        def review_url(i):
+            title, review = pick(reviews, i)
+            return url('reviews-detail', title_id=title, pk=review)
+
+        def delete_review(i):
+            title = pick(titles, i)
+            body = self.created(
+                self.user_client, url('reviews-list', title_id=title),
+                {'text': 'Удаляемый отзыв', 'score': 5},
+            )
+            return url('reviews-detail', title_id=title, pk=body['id']), {}
+
+        def bulk_titles(i):
+            return [
+                pick(titles, i * BULK_ITEMS + offset)
+                for offset in range(min(BULK_ITEMS, len(titles)))
+            ]
+
+        return [
+            Scenario('reviews-list', 'GET', self.anonymous, get(reviews_url)),
+            Scenario(
+                'reviews-list', 'GET', self.anonymous,
+                get(reviews_url, {'pagination': 'cursor'}),
+                variant=' ?pagination=cursor',
+            ),
+            Scenario('reviews-list', 'POST', self.user_client, lambda i: (
+                reviews_url(i), {'text': 'Новый отзыв', 'score': 7},
+            ), self.remove_author_reviews),
+            Scenario(
+                'reviews-detail', 'GET', self.anonymous, get(review_url)
+            ),
+            Scenario('reviews-detail', 'PATCH', self.admin_client, lambda i: (
+                review_url(i), {'text': f'Исправленный отзыв {i}'},
+            )),
+            Scenario(
+                'reviews-detail', 'DELETE', self.user_client, delete_review
+            ),
+            Scenario('reviews-bulk', 'POST', self.user_client, lambda i: (
+                url('reviews-bulk'),
+                [{'title': title, 'text': 'Пакетный отзыв', 'score': 6}
+                 for title in bulk_titles(i)],
+            ), self.remove_author_reviews),
+        ]
+
+    def comments(self):
+        url, get = self.url, self.get
+        reviews, comments = self.data['reviews'], self.data['comments']
+
+        def comments_url(i):
+            title, review = pick(reviews, i)
+            return url('comments-list', title_id=title, review_id=review)
+
+        def comment_url(i):
+            title, review, comment = pick(comments, i)
+            return url(
+                'comments-detail', title_id=title, review_id=review,
+                pk=comment,
+            )
+
+        def delete_comment(i):
+            title, review = pick(reviews, i)
+            body = self.created(
+                self.user_client,
+                url('comments-list', title_id=title, review_id=review),
+                {'text': 'Удаляемый комментарий'},
+            )
+            return url(
+                'comments-detail', title_id=title, review_id=review,
+                pk=body['id'],
+            ), {}
+
+        return [
+            Scenario(
+                'comments-list', 'GET', self.anonymous, get(comments_url)
+            ),
+            Scenario('comments-list', 'POST', self.user_client, lambda i: (
+                comments_url(i), {'text': 'Новый комментарий'},
+            ), self.remove_author_comments),
+            Scenario(
+                'comments-detail', 'GET', self.anonymous, get(comment_url)
+            ),
+            Scenario(
+                'comments-detail', 'PATCH', self.admin_client, lambda i: (
+                    comment_url(i),
+                    {'text': f'Исправленный комментарий {i}'},
+                )
+            ),
+            Scenario(
+                'comments-detail', 'DELETE', self.user_client, delete_comment
+            ),
+            Scenario('comments-bulk', 'POST', self.user_client, lambda i: (
+                url('comments-bulk'),
+                [{'review': pick(reviews, i * BULK_ITEMS + offset)[1],
+                  'text': 'Пакетный комментарий'}
+                 for offset in range(BULK_ITEMS)],
+            ), self.remove_author_comments),
+        ]
+
+    def users(self):
+        url, get = self.url, self.get
+        users, admin_client = self.data['users'], self.admin_client
+
+        def delete_user(i):
+            username = f'bench_deleted_{i}'
+            self.created(
+                admin_client, url('users-list'),
+                {'username': username, 'email': f'{username}@bench.local'},
+            )
+            return url('users-detail', username=username), {}
+
+        return [
+            Scenario(
+                'users-list', 'GET', admin_client, get(url('users-list'))
+            ),
+            Scenario('users-list', 'POST', admin_client, lambda i: (
+                url('users-list'),
+                {'username': f'bench_created_{i}',
+                 'email': f'created{i}@bench.local'},
+            ), self.deleting(
+                admin_client, 'users-detail',
+                username=lambda b: b['username'],
+            )),
+            Scenario('users-detail', 'GET', admin_client, get(
+                lambda i: url('users-detail', username=pick(users, i))
+            )),
+            Scenario('users-detail', 'PATCH', admin_client, lambda i: (
+                url('users-detail', username=pick(users, i)),
+                {'bio': f'Биография {i}'},
+            )),
+            Scenario('users-detail', 'DELETE', admin_client, delete_user),
+            Scenario(
+                'users-me', 'GET', self.user_client, get(url('users-me'))
+            ),
+            Scenario('users-me', 'PATCH', self.user_client, lambda i: (
+                url('users-me'), {'bio': f'Биография {i}'},
+            )),
+        ]
+
+
+class Command(BaseCommand):
+    """Команда для воспроизводимого замера всех маршрутов API."""
+
+    help = ('Заполняет отдельную базу данными заданного объёма и замеряет '
+            'задержку, пропускную способность подряд и число SQL-запросов '
+            'каждого маршрута api/urls.py')
+
+    def add_arguments(self, parser):
+        for name, default, help_text in (
+            ('--titles', 1000, 'Количество произведений.'),
+            ('--categories', 10, 'Количество категорий.'),
+            ('--genres', 20, 'Количество жанров.'),
+            ('--genres-per-title', 2, 'Жанров у каждого произведения.'),
+            ('--users', 50, 'Количество авторов отзывов и комментариев.'),
+            ('--reviews-per-title', 10, 'Отзывов на каждое произведение.'),
+            ('--comments-per-review', 2, 'Комментариев к каждому отзыву.'),
+            ('--requests', 100, 'Замеряемых запросов на сценарий.'),
+            ('--warmup', 10, 'Незамеряемых запросов перед замером.'),
+            ('--seed', 1, 'Зерно генератора случайных данных.'),
+        ):
+            parser.add_argument(
+                name, type=int, default=default, help=help_text
+            )
+        parser.add_argument(
+            '--json',
+            help='Сохранить результаты в JSON-файл.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON-файл прошлого замера: вывести изменения p95 и '
+                 'числа запросов.',
+        )
+        parser.add_argument(
+            '--rollback',
+            action='store_true',
+            help=('Не создавать отдельную базу, а работать в текущей внутри '
+                  'транзакции, которая откатывается в конце. Инвалидация '
+                  'кэша произведений в этом режиме откладывается до конца.'),
+        )
+
+    @contextmanager
+    def benchmark_database(self, rollback):
+        """Отдельная тестовая база или откатываемая транзакция."""
+        if rollback:
+            with transaction.atomic():
+                yield
+                transaction.set_rollback(True)
+            return
+        test_settings = connection.settings_dict['TEST']
+        old_test_name = test_settings['NAME']
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # Файл, а не память: замер с настроенными PRAGMA.
+                test_settings['NAME'] = os.path.join(
+                    directory, 'bench.sqlite3'
+                )
+            old_name = connection.settings_dict['NAME']
+            try:
+                connection.creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False
+                )
+                try:
+                    yield
+                finally:
+                    connection.creation.destroy_test_db(
+                        old_name, verbosity=0
+                    )
+            finally:
+                test_settings['NAME'] = old_test_name
+
+    def seed(self, options):
+        """Создаёт набор данных; одно зерно — одни и те же данные.
+
+        Возвращает ключи только созданных объектов: в режиме --rollback
+        в базе могут быть и другие данные.
+        """
+        rng = random.Random(options['seed'])
+        inserter = BulkInserter(BATCH_SIZE)
+
+        def created(model, ids, *fields, flat=False):
+            return list(model.objects.filter(
+                pk__range=(ids.start, ids.stop - 1)
+            ).order_by('pk').values_list(*fields, flat=flat))
+
+        authors = create_users(inserter, rng, 'bench', options['users'])
+        categories, genres = create_catalog(
+            inserter, 'bench', options['categories'], options['genres']
+        )
+        titles = inserter.create(Title, (
+            Title(
+                name=f'Произведение {i}',
+                year=rng.randint(1900, 2020),
+                description=words(rng, 8),
+                category_id=rng.choice(categories),
+            )
+            for i in range(options['titles'])
+        ))
+        genres_per_title = min(options['genres_per_title'], len(genres))
+        inserter.create(TitleGenre, (
+            TitleGenre(title_id=title, genre_id=genre)
+            for title in titles
+            for genre in rng.sample(genres, genres_per_title)
+        ))
+        review_titles = [
+            title for title in titles
+            for _ in range(options['reviews_per_title'])
+        ]
+        reviews = list(zip(review_titles, inserter.create(Review, (
+            Review(
+                title_id=title,
+                author_id=author,
+                text=words(rng, 12),
+                score=rng.randint(1, 10),
+            )
+            for title in titles
+            for author in rng.sample(authors, options['reviews_per_title'])
+        ))))
+        Title.objects.filter(
+            pk__range=(titles.start, titles.stop - 1)
+        ).recalculate_rating()
+        comment_reviews = [
+            review for review in reviews
+            for _ in range(options['comments_per_review'])
+        ]
+        comments = inserter.create(Comment, (
+            Comment(
+                review_id=review,
+                author_id=rng.choice(authors),
+                text=words(rng, 6),
+            )
+            for _, review in comment_reviews
+        ))
+        inserter.finish()
+        return {
+            'titles': list(titles),
+            'categories': created(Category, categories, 'slug', flat=True),
+            'genres': created(Genre, genres, 'slug', flat=True),
+            'reviews': reviews,
+            'comments': [
+                (title, review, comment) for (title, review), comment
+                in zip(comment_reviews[:BATCH_SIZE], comments)
+            ],
+            'users': created(User, authors, 'username', flat=True),
+        }
+
+    def build_scenarios(self, data):
+        builder = ScenarioBuilder(data)
+        return [
+            Scenario(
+                'api-root', 'GET', builder.anonymous,
+                builder.get(builder.url('api-root')),
+            ),
+            *builder.auth(),
+            *builder.titles(),
+            *builder.catalog(),
+            *builder.reviews(),
+            *builder.comments(),
+            *builder.users(),
+            Scenario(
+                'stats', 'GET', builder.admin_client,
+                builder.get(builder.url('stats')),
+            ),
+        ]
+
+    def run_scenario(self, scenario, requests, warmup):
+        latencies = []
+        queries = errors = 0
+        for i in range(warmup + requests):
+            path, data = scenario.build(i)
+            started = perf_counter()
+            response = scenario.send(path, data)
+            elapsed = perf_counter() - started
+            if scenario.cleanup is not None:
+                scenario.cleanup(response)
+            if i < warmup:
+                continue
+            latencies.append(elapsed)
+            # Запросы считает QueryMetricsMiddleware, как для QUERY_BUDGETS.
+            metrics = getattr(response.wsgi_request, 'query_metrics', None)
+            queries += metrics.queries if metrics is not None else 0
+            errors += response.status_code >= 400
+        return {
+            'route': scenario.route,
+            'method': scenario.method,
+            'variant': scenario.variant,
+            **percentiles(latencies),
+            # Запросы идут подряд по одному: это обратная величина средней
+            # задержки, а не пропускная способность под нагрузкой.
+            'sequential_rps': len(latencies) / sum(latencies),
+            'queries': queries / len(latencies),
+            'errors': errors,
+        }
+
+    def report(self, label, result, baseline):
+        line = (
+            f'{label:<40} p50 {result["p50_ms"]:>7.2f}  '
+            f'p95 {result["p95_ms"]:>7.2f}  p99 {result["p99_ms"]:>7.2f} мс  '
+            f'подряд {result["sequential_rps"]:>8.1f} запр/с  '
+            f'SQL {result["queries"]:>5.1f}  ошибок {result["errors"]:>3}'
+        )
+        previous = baseline.get(label)
+        if previous is not None:
+            line += (
+                f'  Δp95 {result["p95_ms"] - previous["p95_ms"]:>+7.2f} мс'
+                f'  ΔSQL {result["queries"] - previous["queries"]:>+5.1f}'
+            )
+        self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        for name in ('titles', 'categories', 'genres', 'reviews_per_title',
+                     'comments_per_review', 'requests'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должно быть больше нуля.'
+                )
+        if options['users'] < options['reviews_per_title']:
+            raise CommandError(
+                'Авторов (--users) должно быть не меньше, чем отзывов '
+                'на произведение (--reviews-per-title).'
+            )
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = {
+                    f'{result["method"]} {result["route"]}'
+                    f'{result["variant"]}': result
+                    for result in json.load(file)['results']
+                }
+
+        results = []
+        reset_caches()
+        with self.benchmark_database(options['rollback']):
+            data = self.seed(options)
+            scenarios = self.build_scenarios(data)
+            uncovered = sorted(
+                route_names(urls.urlpatterns)
+                - {scenario.route for scenario in scenarios}
+            )
+            if uncovered:
+                self.stderr.write(
+                    'Маршруты без сценария: ' + ', '.join(uncovered)
+                )
+            for scenario in scenarios:
+                result = self.run_scenario(
+                    scenario, options['requests'], options['warmup']
+                )
+                results.append(result)
+                self.report(scenario.label, result, baseline)
+        reset_caches()
+
+        if options['json']:
+            dataset = {
+                name: options[name] for name in (
+                    'titles', 'categories', 'genres', 'genres_per_title',
+                    'users', 'reviews_per_title', 'comments_per_review',
+                    'seed',
+                )
+            }
+            with open(options['json'], 'w', encoding='utf-8') as file:
+                json.dump({
+                    'commit': current_commit(),
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': connection.vendor,
+                    'dataset': dataset,
+                    'requests': options['requests'],
+                    'results': results,
+                    'uncovered': uncovered,
+                }, file, ensure_ascii=False, indent=2)
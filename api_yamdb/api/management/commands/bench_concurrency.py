@@ -0,0 +1,161 @@
+import threading
+from statistics import quantiles
+from time import perf_counter, sleep
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from reviews.models import Review, Title, User
+
+BENCH_USERNAME = 'bench_writer'
+# Профиль SQLite по умолчанию: журнал отката, читатели ждут писателя.
+ROLLBACK_JOURNAL_PRAGMAS = {'journal_mode': 'DELETE'}
+
+
+class Command(BaseCommand):
+    """Команда для замера чтения под конкурентной записью в SQLite."""
+
+    help = ('Измеряет пропускную способность чтения списка произведений, '
+            'пока другой поток создаёт и удаляет отзывы')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers',
+            type=int,
+            default=4,
+            help='Количество потоков-читателей.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Длительность каждого замера в секундах.',
+        )
+        parser.add_argument(
+            '--compare',
+            action='store_true',
+            help=('Повторить замеры с журналом отката SQLite '
+                  '(journal_mode=DELETE) для сравнения.'),
+        )
+
+    def read_loop(self, url, auth, stop, stats):
+        client = Client(raise_request_exception=False)
+        try:
+            while not stop.is_set():
+                started = perf_counter()
+                response = client.get(url, HTTP_AUTHORIZATION=auth)
+                if response.status_code == 200:
+                    stats['latencies'].append(perf_counter() - started)
+                else:
+                    stats['errors'] += 1
+        finally:
+            connection.close()
+
+    def write_loop(self, title, auth, stop, stats):
+        client = Client(raise_request_exception=False)
+        url = reverse('api:reviews-list', kwargs={'title_id': title.pk})
+        try:
+            while not stop.is_set():
+                response = client.post(
+                    url, {'text': 'Замер', 'score': 5},
+                    HTTP_AUTHORIZATION=auth, content_type='application/json'
+                )
+                if response.status_code != 201:
+                    stats['errors'] += 1
+                    continue
+                response = client.delete(
+                    f'{url}{response.json()["id"]}/', HTTP_AUTHORIZATION=auth
+                )
+                stats['writes'] += 2 if response.status_code == 204 else 1
+        finally:
+            connection.close()
+
+    def run_phase(self, title, auth, readers, duration, with_writer):
+        stop = threading.Event()
+        read_stats = [{'latencies': [], 'errors': 0} for _ in range(readers)]
+        write_stats = {'writes': 0, 'errors': 0}
+        threads = [
+            threading.Thread(
+                target=self.read_loop,
+                args=(reverse('api:titles-list'), auth, stop, stats)
+            )
+            for stats in read_stats
+        ]
+        if with_writer:
+            threads.append(threading.Thread(
+                target=self.write_loop, args=(title, auth, stop, write_stats)
+            ))
+        for thread in threads:
+            thread.start()
+        sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        latencies = sorted(
+            latency for stats in read_stats for latency in stats['latencies']
+        )
+        percentiles = (
+            quantiles(latencies, n=100) if len(latencies) > 1
+            else latencies * 99 or [0] * 99
+        )
+        return {
+            'reads': len(latencies) / duration,
+            'p50': percentiles[49] * 1000,
+            'p95': percentiles[94] * 1000,
+            'read_errors': sum(stats['errors'] for stats in read_stats),
+            'writes': write_stats['writes'] / duration,
+            'write_errors': write_stats['errors'],
+        }
+
+    def use_pragmas(self, pragmas):
+        """Новые соединения будут открыты с указанными PRAGMA."""
+        connections.close_all()
+        connections.databases[DEFAULT_DB_ALIAS]['PRAGMAS'] = pragmas
+        # Первое соединение переключает режим журнала файла базы.
+        connection.ensure_connection()
+
+    def report(self, profile, phase, result):
+        self.stdout.write(
+            f'{profile:<10} {phase:<17} '
+            f'чтений/с {result["reads"]:>8.1f}  '
+            f'p50 {result["p50"]:>7.1f} мс  p95 {result["p95"]:>7.1f} мс  '
+            f'ошибок чтения {result["read_errors"]:>4}  '
+            f'записей/с {result["writes"]:>6.1f}  '
+            f'ошибок записи {result["write_errors"]:>4}'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite' or connection.is_in_memory_db():
+            raise CommandError('Замер рассчитан на SQLite в файле.')
+        title = Title.objects.order_by('pk').first()
+        if title is None:
+            raise CommandError(
+                'Нет произведений: загрузите данные командой import.'
+            )
+        user, _ = User.objects.get_or_create(
+            username=BENCH_USERNAME,
+            defaults={'email': f'{BENCH_USERNAME}@yamdb.local'},
+        )
+        Review.objects.filter(author=user, title=title).delete()
+        auth = f'Bearer {AccessToken.for_user(user)}'
+
+        configured = connection.settings_dict.get('PRAGMAS', {})
+        profiles = [('настроенный', configured)]
+        if options['compare']:
+            profiles.append(('журнал', ROLLBACK_JOURNAL_PRAGMAS))
+        try:
+            for profile, pragmas in profiles:
+                self.use_pragmas(pragmas)
+                for phase, with_writer in (
+                    ('только чтение', False), ('чтение + запись', True)
+                ):
+                    self.report(profile, phase, self.run_phase(
+                        title, auth, options['readers'],
+                        options['duration'], with_writer
+                    ))
+        finally:
+            self.use_pragmas(configured)
+            user.delete()
@@ -0,0 +1,59 @@
+import json
+import timeit
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from reviews import validators
+from reviews.constants import MAX_NAME_LENGTH
+
+CASES = (
+    ('validate_username', 'короткое имя', 'user_1'),
+    ('validate_username', 'длинное имя', 'u' * MAX_NAME_LENGTH),
+    ('validate_username', 'недопустимый символ', 'user name'),
+    ('validate_username', 'имя me', 'Me'),
+    ('validate_year', 'прошлый год', 1999),
+    ('validate_year', 'будущий год', 9999),
+)
+
+
+def measure(validator, value, number):
+    """Среднее время одного вызова в наносекундах."""
+    def call():
+        try:
+            validator(value)
+        except ValidationError:
+            pass
+    return min(timeit.repeat(call, number=number, repeat=5)) / number * 1e9
+
+
+class Command(BaseCommand):
+    """Команда для микробенчмарка валидаторов из reviews.validators."""
+
+    help = 'Измеряет время вызова валидаторов на типичных значениях'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--number',
+            type=int,
+            default=100000,
+            help='Сколько вызовов в одном замере.',
+        )
+        parser.add_argument(
+            '--json',
+            help='Сохранить результаты в JSON-файл.',
+        )
+
+    def handle(self, *args, **options):
+        results = []
+        for name, case, value in CASES:
+            nanoseconds = measure(
+                getattr(validators, name), value, options['number']
+            )
+            results.append(
+                {'validator': name, 'case': case, 'ns': nanoseconds}
+            )
+            self.stdout.write(f'{name:<18} {case:<20} {nanoseconds:>8.0f} нс')
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
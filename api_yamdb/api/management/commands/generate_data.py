@@ -0,0 +1,212 @@
+import math
+import random
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.management.datagen import (
+    SCORE_WEIGHTS,
+    SCORES,
+    BulkInserter,
+    batches,
+    create_catalog,
+    create_users,
+    distinct_ranks,
+    words,
+    zipf_rank,
+)
+from api.title_cache import title_cache
+from reviews.models import Comment, Review, Title, TitleGenre, User
+from reviews.validators import current_year, validate_username
+
+MAX_GENRES_PER_TITLE = 3
+
+
+class Command(BaseCommand):
+    """Команда для генерации больших наборов данных с реалистичным перекосом.
+
+    Число отзывов на произведение подчиняется закону Ципфа, авторы
+    отзывов и комментариев — степенному закону: немногие пишут много.
+    Данные пишутся пачками bulk_create по мере генерации, поэтому память
+    не растёт с объёмом: в ней держится только текущая пачка. Ключи
+    назначаются заранее (см. BulkInserter), так что генерацию нельзя
+    запускать одновременно с записью в эти таблицы.
+    """
+
+    help = ('Генерирует пользователей, произведения, жанры, отзывы '
+            'и комментарии в объёме миллионов строк')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=100000,
+            help='Количество пользователей.',
+        )
+        parser.add_argument(
+            '--titles', type=int, default=100000,
+            help='Количество произведений.',
+        )
+        parser.add_argument(
+            '--categories', type=int, default=20,
+            help='Количество категорий.',
+        )
+        parser.add_argument(
+            '--genres', type=int, default=50,
+            help='Количество жанров.',
+        )
+        parser.add_argument(
+            '--reviews', type=int, default=1000000,
+            help=('Ожидаемое общее число отзывов; на одно произведение '
+                  'приходится не больше отзывов, чем пользователей.'),
+        )
+        parser.add_argument(
+            '--comments-per-review', type=float, default=1.0,
+            help='Среднее число комментариев к отзыву.',
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель степенного закона (больше — сильнее перекос).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Размер пачки bulk_create.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='Зерно генератора случайных чисел.',
+        )
+        parser.add_argument(
+            '--prefix', default='gen',
+            help='Префикс имён пользователей и slug, чтобы не пересечься '
+                 'с существующими данными.',
+        )
+
+    def check_options(self, options):
+        for name in ('users', 'titles', 'categories', 'genres',
+                     'batch_size'):
+            if options[name] < 1:
+                raise CommandError(
+                    f'--{name.replace("_", "-")} должно быть больше нуля.'
+                )
+        if options['reviews'] < 0 or options['comments_per_review'] < 0:
+            raise CommandError(
+                'Число отзывов и комментариев не может быть отрицательным.'
+            )
+        if options['zipf'] <= 0:
+            raise CommandError('--zipf должен быть больше нуля.')
+        prefix = options['prefix']
+        validate_username(f'{prefix}_0')
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже есть, '
+                'укажите другой --prefix.'
+            )
+
+    def stage(self, name, count, started):
+        self.stdout.write(
+            f'{name}: {count} ({perf_counter() - started:.1f} с)'
+        )
+
+    def reviews_per_title(self, options):
+        """Ожидаемое число отзывов произведения по рангу (закон Ципфа)."""
+        titles, exponent = options['titles'], options['zipf']
+        harmonic = math.fsum(
+            (rank + 1) ** -exponent for rank in range(titles)
+        )
+        scale = options['reviews'] / harmonic
+
+        def expected(rank):
+            return min(scale * (rank + 1) ** -exponent, options['users'])
+        return expected
+
+    def generate_reviews(self, rng, titles, first_rank, user_ids, expected,
+                         exponent):
+        """Отзывы на пачку произведений; пара (title, author) уникальна."""
+        for rank, title in enumerate(titles, first_rank):
+            mean = expected(rank)
+            count = int(mean) + (rng.random() < mean - int(mean))
+            for author in distinct_ranks(
+                rng, len(user_ids), count, exponent
+            ):
+                yield Review(
+                    title_id=title,
+                    author_id=user_ids[author],
+                    text=words(rng, rng.randint(5, 40)),
+                    score=rng.choices(SCORES, SCORE_WEIGHTS)[0],
+                )
+
+    def generate_comments(self, rng, reviews, user_ids, options):
+        mean = options['comments_per_review']
+        if not mean:
+            return
+        for review in reviews:
+            for _ in range(int(rng.expovariate(1 / mean) + 0.5)):
+                yield Comment(
+                    review_id=review.pk,
+                    author_id=user_ids[
+                        zipf_rank(rng, len(user_ids), options['zipf'])
+                    ],
+                    text=words(rng, rng.randint(3, 20)),
+                )
+
+    def handle(self, *args, **options):
+        self.check_options(options)
+        rng = random.Random(options['seed'])
+        prefix, batch_size = options['prefix'], options['batch_size']
+        inserter = BulkInserter(batch_size)
+        started = perf_counter()
+
+        user_ids = create_users(inserter, rng, prefix, options['users'])
+        self.stage('пользователей', len(user_ids), started)
+        category_ids, genre_ids = create_catalog(
+            inserter, prefix, options['categories'], options['genres']
+        )
+        self.stage('категорий и жанров',
+                   len(category_ids) + len(genre_ids), started)
+
+        expected = self.reviews_per_title(options)
+        last_year = current_year.get()
+        counts = {'titles': 0, 'reviews': 0, 'comments': 0}
+        for title_batch in batches((
+            Title(
+                name=f'Произведение {i}',
+                year=rng.randint(1800, last_year),
+                description=words(rng, rng.randint(5, 30)),
+                category_id=category_ids[
+                    zipf_rank(rng, len(category_ids), options['zipf'])
+                ],
+            )
+            for i in range(options['titles'])
+        ), batch_size):
+            first_rank = counts['titles']
+            title_ids = inserter.insert(Title, title_batch)
+            inserter.create(TitleGenre, (
+                TitleGenre(title_id=title, genre_id=genre_ids[genre])
+                for title in title_ids
+                for genre in distinct_ranks(
+                    rng, len(genre_ids),
+                    rng.randint(1, min(MAX_GENRES_PER_TITLE, len(genre_ids))),
+                    options['zipf'],
+                )
+            ))
+            for review_batch in batches(self.generate_reviews(
+                rng, title_ids, first_rank, user_ids, expected,
+                options['zipf'],
+            ), batch_size):
+                with transaction.atomic():
+                    inserter.insert(Review, review_batch)
+                    counts['comments'] += len(inserter.create(
+                        Comment, self.generate_comments(
+                            rng, review_batch, user_ids, options
+                        )
+                    ))
+                counts['reviews'] += len(review_batch)
+            Title.objects.filter(pk__in=title_ids).recalculate_rating()
+            counts['titles'] += len(title_batch)
+            self.stage(
+                'произведений / отзывов / комментариев',
+                '{titles} / {reviews} / {comments}'.format(**counts),
+                started,
+            )
+        inserter.finish()
+        title_cache.invalidate(everything=True)
@@ -1,6 +1,15 @@
 import csv
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from time import perf_counter
 
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections, IntegrityError, transaction
+
+from api.title_cache import title_cache
 from reviews.models import (
     Category,
     Genre,
@@ -10,6 +19,7 @@ from reviews.models import (
     User,
     TitleGenre
 )
+from reviews.validators import BATCH_VALIDATORS
 
 model_csv_dict = {
     'static/data/category.csv': Category,
@@ -21,47 +31,306 @@ model_csv_dict = {
     'static/data/comments.csv': Comment,
 }
 
+CHUNK_SIZE = 5000
+BATCH_SIZE = 1000
+
+
+def import_table_worker(path, model, chunk_size, batch_size):
+    """Загрузка одной таблицы в отдельном процессе.
+
+    Процесс открывает собственное соединение с базой, а множества id
+    внешних ключей строит заново: таблицы-зависимости к этому моменту
+    уже загружены.
+    """
+    command = Command()
+    command.ids = {}
+    start = perf_counter()
+    rows, successful = command.import_table(
+        path, model, chunk_size, batch_size
+    )
+    return rows, successful, perf_counter() - start
+
 
 class Command(BaseCommand):
     """Команда для импорта csv в базу данных."""
 
     help = 'Импорт csv файлов в таблицы базы данных'
 
-    def create_row_fields(self, row):
-        """Дополняет строку таблицы экземплярами модели."""
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Сколько строк csv читать и сохранять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Размер пакета для bulk_create.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Сколько таблиц загружать параллельно.',
+        )
+
+    def get_dependencies(self):
+        """Граф зависимостей таблиц по внешним ключам моделей."""
+        models = set(model_csv_dict.values())
+        return {
+            model: {
+                field.related_model
+                for field in model._meta.concrete_fields
+                if field.many_to_one
+                and field.related_model in models
+                and field.related_model is not model
+            }
+            for model in models
+        }
+
+    def get_ids(self, model):
+        """Множество первичных ключей таблицы, загружается один раз."""
+        if model not in self.ids:
+            self.ids[model] = set(
+                model.objects.values_list('pk', flat=True).iterator()
+            )
+        return self.ids[model]
+
+    def get_columns(self, model):
+        """Соответствие колонок csv полям модели.
+
+        Внешний ключ может называться в csv как поле (`author`),
+        так и как колонка (`title_id`).
+        """
+        columns = {}
+        for field in model._meta.concrete_fields:
+            columns[field.name] = field
+            columns[field.attname] = field
+        return columns
+
+    def get_batch_validators(self, model):
+        """Поля модели и пакетные версии их валидаторов."""
+        # Валидаторы-объекты Django не хешируются, поэтому без `in`.
+        return [
+            (field, validator, batch_validator)
+            for field in model._meta.concrete_fields
+            for validator in field.validators
+            for single, batch_validator in BATCH_VALIDATORS.items()
+            if validator is single
+        ]
+
+    def create_row_fields(self, row, columns, batch_fields=()):
+        """Превращает строку csv в аргументы модели.
+
+        Внешние ключи сверяются с уже загруженными id без запросов к базе.
+        Поля из batch_fields приводятся к типу поля для пакетной проверки.
+        """
+        fields = {}
+        for column, value in row.items():
+            field = columns.get(column)
+            if field is None:
+                raise ValueError(f'Неизвестная колонка {column}')
+            if field.primary_key:
+                value = int(value)
+            elif field in batch_fields:
+                value = field.to_python(value)
+            elif field.many_to_one:
+                value = int(value) if value else None
+                if value is not None and value not in self.get_ids(
+                        field.related_model):
+                    raise ValueError(
+                        f'{field.related_model.__name__} с id={value} '
+                        'не существует'
+                    )
+            fields[field.attname] = value
+        return fields
+
+    def validate_chunk(self, rows, batch_validators):
+        """Проверяет колонки пачки целиком, возвращает строки без ошибок.
+
+        Сообщается о каждой ошибочной строке, а не только о первой.
+        """
+        for field, validator, batch_validator in batch_validators:
+            invalid = set(batch_validator(
+                [fields[field.attname] for fields in rows]
+            ))
+            for index in sorted(invalid):
+                # Одиночный валидатор даёт текст ошибки; если он с пакетным
+                # не согласен, строка всё равно отбрасывается.
+                message = 'значение не прошло пакетную проверку'
+                try:
+                    validator(rows[index][field.attname])
+                except ValidationError as error:
+                    message = ' '.join(error.messages)
+                print(f'Ошибка в строке {rows[index]["id"]}.'
+                      f'Текст - {field.name}: {message}')
+            rows = [
+                fields for index, fields in enumerate(rows)
+                if index not in invalid
+            ]
+        return rows
+
+    def save_chunk(self, model, objects, batch_size):
+        """Сохраняет пачку объектов, возвращает сохранённые."""
         try:
-            if row.get('author'):
-                row['author'] = User.objects.get(pk=row['author'])
-            if row.get('review_id'):
-                row['review'] = Review.objects.get(pk=row['review_id'])
-            if row.get('title_id'):
-                row['title'] = Title.objects.get(pk=row['title_id'])
-            if row.get('category'):
-                row['category'] = Category.objects.get(pk=row['category'])
-            if row.get('genre'):
-                row['genre'] = Genre.objects.get(pk=row['genre'])
-        except Exception as error:
-            print(f'Ошибка в строке {row.get("id")}.'
-                  f'Текст - {error}')
-        return row
+            with transaction.atomic():
+                model.objects.bulk_create(objects, batch_size=batch_size)
+            return objects
+        except IntegrityError:
+            pass
+        # Пачка не прошла целиком: сохраняем построчно, чтобы
+        # пропустить только ошибочные строки.
+        saved = []
+        for obj in objects:
+            try:
+                with transaction.atomic():
+                    obj.save(force_insert=True)
+                saved.append(obj)
+            except IntegrityError as error:
+                print(f'Ошибка в строке {obj.pk}.'
+                      f'Текст - {error}')
+        return saved
 
-    def handle(self, *args, **options):
-        for i in model_csv_dict.items():
-            path, model = i
-            rows = 0
-            successful = 0
-            print(f'Заполняем модель {model.__name__}')
-            with open(path, encoding='utf-8', mode='r') as file:
-                csv_read = csv.DictReader(file)
-                for row in csv_read:
+    def import_table(self, path, model, chunk_size, batch_size):
+        """Потоково загружает csv файл в таблицу модели."""
+        columns = self.get_columns(model)
+        batch_validators = self.get_batch_validators(model)
+        batch_fields = {field for field, _, _ in batch_validators}
+        ids = self.get_ids(model)
+        rows = 0
+        successful = 0
+        with open(path, encoding='utf-8', mode='r') as file:
+            csv_read = csv.DictReader(file)
+            while True:
+                chunk = list(islice(csv_read, chunk_size))
+                if not chunk:
+                    break
+                parsed = []
+                for row in chunk:
                     rows += 1
-                    row = self.create_row_fields(row)
                     try:
-                        model.objects.get_or_create(**row)
-                        successful += 1
-                    except Exception as error:
+                        fields = self.create_row_fields(
+                            row, columns, batch_fields
+                        )
+                    except (TypeError, ValueError, ValidationError) as error:
                         print(f'Ошибка в строке {row.get("id")}.'
                               f'Текст - {error}')
-            print(f'Заполнение модели {model.__name__} завершено. '
-                  f'Строк: {rows}. Успешно добавлено: {successful}.',
-                  )
+                        continue
+                    if fields['id'] in ids:
+                        continue
+                    parsed.append(fields)
+                objects = [
+                    model(**fields)
+                    for fields in self.validate_chunk(parsed, batch_validators)
+                ]
+                if objects:
+                    saved = self.save_chunk(model, objects, batch_size)
+                    successful += len(saved)
+                    ids.update(obj.pk for obj in saved)
+        return rows, successful
+
+    def reset_sequences(self, models):
+        """После вставки с явными id сдвигает последовательности pk."""
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def report(self, model, rows, successful, elapsed):
+        print(f'Заполнение модели {model.__name__} завершено. '
+              f'Строк: {rows}. Успешно добавлено: {successful}. '
+              f'Скорость: {rows / elapsed if elapsed else 0:.0f} '
+              'строк/с.')
+
+    def run_sequential(self, order, options):
+        self.ids = {}
+        total_rows = 0
+        for model in order:
+            print(f'Заполняем модель {model.__name__}')
+            start = perf_counter()
+            rows, successful = self.import_table(
+                self.paths[model], model,
+                options['chunk_size'], options['batch_size']
+            )
+            self.report(model, rows, successful, perf_counter() - start)
+            total_rows += rows
+        return total_rows
+
+    def run_parallel(self, dependencies, options):
+        total_rows = 0
+        pending = dict(dependencies)
+        done = set()
+        running = {}
+        # Дочерние процессы не должны наследовать открытые соединения.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=context) as pool:
+            while pending or running:
+                ready = [
+                    model for model in model_csv_dict.values()
+                    if model in pending and pending[model] <= done
+                ]
+                for model in ready:
+                    del pending[model]
+                    print(f'Заполняем модель {model.__name__}')
+                    future = pool.submit(
+                        import_table_worker, self.paths[model], model,
+                        options['chunk_size'], options['batch_size']
+                    )
+                    running[future] = model
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    model = running.pop(future)
+                    rows, successful, elapsed = future.result()
+                    self.report(model, rows, successful, elapsed)
+                    total_rows += rows
+                    done.add(model)
+        return total_rows
+
+    def get_order(self, dependencies):
+        """Порядок загрузки, в котором зависимости идут раньше."""
+        order = []
+        pending = dict(dependencies)
+        while pending:
+            ready = [
+                model for model in model_csv_dict.values()
+                if model in pending and pending[model] <= set(order)
+            ]
+            if not ready:
+                raise CommandError(
+                    'Циклическая зависимость между таблицами: '
+                    + ', '.join(model.__name__ for model in pending)
+                )
+            for model in ready:
+                del pending[model]
+                order.append(model)
+        return order
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers должно быть не меньше 1.')
+        self.paths = {model: path for path, model in model_csv_dict.items()}
+        dependencies = self.get_dependencies()
+        order = self.get_order(dependencies)
+        total_start = perf_counter()
+        if options['workers'] == 1:
+            total_rows = self.run_sequential(order, options)
+        else:
+            if connection.vendor == 'sqlite':
+                print('SQLite выполняет запись последовательно, '
+                      'параллельная загрузка ускорит только чтение csv.')
+            total_rows = self.run_parallel(dependencies, options)
+        self.reset_sequences(list(model_csv_dict.values()))
+        updated = Title.objects.recalculate_rating()
+        title_cache.invalidate(everything=True)
+        print(f'Рейтинг пересчитан для произведений: {updated}.')
+        elapsed = perf_counter() - total_start
+        print(f'Импорт завершён. Строк: {total_rows}. '
+              f'Время: {elapsed:.2f} с. '
+              f'Скорость: {total_rows / elapsed if elapsed else 0:.0f} '
+              'строк/с.')
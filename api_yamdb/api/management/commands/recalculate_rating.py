@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.title_cache import title_cache
+from reviews.models import Title
+
+
+class Command(BaseCommand):
+    """Команда для пересчёта хранимого рейтинга произведений."""
+
+    help = 'Пересчитывает рейтинг произведений и сообщает о расхождениях'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = list(
+                Title.objects.with_rating_drift().values(
+                    'id', 'name', 'score_sum', 'reviews_count',
+                    'actual_score_sum', 'actual_reviews_count',
+                )
+            )
+            for title in drifted:
+                self.stdout.write(
+                    f'Произведение {title["id"]} ({title["name"]}): '
+                    f'сумма оценок {title["score_sum"]} -> '
+                    f'{title["actual_score_sum"]}, отзывов '
+                    f'{title["reviews_count"]} -> '
+                    f'{title["actual_reviews_count"]}.'
+                )
+            if drifted and not options['dry_run']:
+                Title.objects.filter(
+                    pk__in=[title['id'] for title in drifted]
+                ).recalculate_rating()
+                title_cache.invalidate(
+                    titles=[title['id'] for title in drifted]
+                )
+        self.stdout.write(
+            f'Расхождений найдено: {len(drifted)}. '
+            + ('Исправления не вносились.' if options['dry_run']
+               else f'Исправлено: {len(drifted)}.')
+        )
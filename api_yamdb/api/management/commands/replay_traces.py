@@ -0,0 +1,245 @@
+import json
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.bench_api import percentiles
+from api.traces import MASK, trace_files
+
+REPLAYED_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def read_trace(path, limit=None):
+    """Записи трассы всех процессов по времени; битые строки пропускаются.
+
+    Файлы процессов сливаются и сортируются по ts: в одном файле записи
+    идут в порядке завершения запросов, а не их начала.
+    """
+    files = trace_files(path)
+    if not files:
+        raise FileNotFoundError(f'нет файлов трассы {path}')
+    entries = []
+    for name in files:
+        with open(name, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and 'ts' in entry:
+                    entries.append(entry)
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries[:limit]
+
+
+def query_string(params):
+    """Строка запроса из сохранённых параметров без замаскированных."""
+    return urlencode(
+        [(key, value) for key, values in params.items() if values != MASK
+         for value in values]
+    )
+
+
+class Command(BaseCommand):
+    """Команда для воспроизведения трассы запросов на локальном сервере.
+
+    Повторяются только безопасные методы: тела запросов в трассу
+    не пишутся. Записанная задержка измерена middleware на сервере,
+    повторная — на клиенте, вместе с сетью и очередью к серверу.
+    """
+
+    help = ('Повторяет запросы из трассы TRACE_CAPTURE_PATH на работающем '
+            'сервере, сохраняя интервалы между ними (с ускорением), '
+            'и сравнивает задержки с записанными')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'trace',
+            nargs='?',
+            help=('Путь трассы, как в TRACE_CAPTURE_PATH (по умолчанию '
+                  'он же): читаются файлы всех процессов.'),
+        )
+        parser.add_argument(
+            '--base-url',
+            default='http://127.0.0.1:8000',
+            help='Адрес сервера, на котором воспроизводится трасса.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Сколько запросов может выполняться одновременно.',
+        )
+        parser.add_argument(
+            '--speedup',
+            type=float,
+            default=1.0,
+            help=('Во сколько раз сжать интервалы между запросами; '
+                  '0 — отправлять без пауз.'),
+        )
+        parser.add_argument(
+            '--token',
+            help=('JWT для запросов, записанных с авторизацией; без него '
+                  'такие запросы пропускаются.'),
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Прочитать не больше указанного числа записей трассы.',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Тайм-аут одного запроса в секундах.',
+        )
+        parser.add_argument(
+            '--json',
+            help='Сохранить сравнение в JSON-файл.',
+        )
+
+    def send(self, entry, base_url, timeout):
+        """Выполняет запрос; возвращает (статус или None, задержку)."""
+        url = base_url.rstrip('/') + entry['path']
+        params = query_string(entry.get('params', {}))
+        if params:
+            url = f'{url}?{params}'
+        headers = {}
+        if entry.get('authenticated'):
+            headers['Authorization'] = f'Bearer {self.token}'
+        request = Request(url, method=entry['method'], headers=headers)
+        started = perf_counter()
+        try:
+            with urlopen(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            error.read()
+            status = error.code
+        except (URLError, OSError):
+            status = None
+        return status, perf_counter() - started
+
+    def replay(self, entries, options):
+        """Отправляет записи по расписанию трассы.
+
+        Одновременно выполняется не больше concurrency запросов; если
+        сервер не успевает, отправка отстаёт от расписания, и наибольшее
+        отставание попадает в lag.
+        """
+        results = defaultdict(lambda: {
+            'captured': [], 'replayed': [], 'status_mismatches': 0,
+            'failed': 0,
+        })
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(options['concurrency'])
+        stats = {'replayed': 0, 'skipped': 0, 'lag': 0.0}
+
+        def run(entry):
+            try:
+                status, latency = self.send(
+                    entry, options['base_url'], options['timeout']
+                )
+            finally:
+                slots.release()
+            with lock:
+                route = results[f'{entry["method"]} {entry["route"]}']
+                if status is None:
+                    route['failed'] += 1
+                    return
+                route['captured'].append(entry['latency_ms'] / 1000)
+                route['replayed'].append(latency)
+                route['status_mismatches'] += status != entry['status']
+
+        first = None
+        started = perf_counter()
+        with ThreadPoolExecutor(
+            max_workers=options['concurrency'],
+            thread_name_prefix='replay',
+        ) as executor:
+            for entry in entries:
+                if entry.get('method') not in REPLAYED_METHODS or (
+                    entry.get('authenticated') and not self.token
+                ):
+                    stats['skipped'] += 1
+                    continue
+                if first is None:
+                    first = entry['ts']
+                if options['speedup']:
+                    due = (entry['ts'] - first) / options['speedup']
+                    delay = due - (perf_counter() - started)
+                    if delay > 0:
+                        sleep(delay)
+                    else:
+                        stats['lag'] = max(stats['lag'], -delay)
+                slots.acquire()
+                executor.submit(run, entry)
+                stats['replayed'] += 1
+        stats['duration'] = perf_counter() - started
+        return results, stats
+
+    def handle(self, *args, **options):
+        path = options['trace'] or settings.TRACE_CAPTURE_PATH
+        if not path:
+            raise CommandError(
+                'Укажите файл трассы или задайте TRACE_CAPTURE_PATH.'
+            )
+        if options['concurrency'] < 1 or options['speedup'] < 0:
+            raise CommandError(
+                '--concurrency должно быть больше нуля, --speedup — '
+                'не меньше нуля.'
+            )
+        self.token = options['token']
+        try:
+            results, stats = self.replay(
+                read_trace(path, options['limit']), options
+            )
+        except OSError as error:
+            raise CommandError(f'Не удалось прочитать трассу: {error}')
+
+        report = []
+        for label, route in sorted(results.items()):
+            row = {'route': label, 'count': len(route['replayed'])}
+            if route['replayed']:
+                captured = percentiles(route['captured'])
+                replayed = percentiles(route['replayed'])
+                row.update(
+                    captured=captured,
+                    replayed=replayed,
+                    p95_change=(
+                        replayed['p95_ms'] / captured['p95_ms']
+                        if captured['p95_ms'] else None
+                    ),
+                )
+                self.stdout.write(
+                    f'{label:<28} {row["count"]:>6}  записано p50/p95/p99 '
+                    f'{captured["p50_ms"]:>7.2f} {captured["p95_ms"]:>7.2f} '
+                    f'{captured["p99_ms"]:>7.2f}  повтор '
+                    f'{replayed["p50_ms"]:>7.2f} {replayed["p95_ms"]:>7.2f} '
+                    f'{replayed["p99_ms"]:>7.2f} мс  '
+                    f'другой статус {route["status_mismatches"]:>4}  '
+                    f'ошибок {route["failed"]:>4}'
+                )
+            row.update(
+                status_mismatches=route['status_mismatches'],
+                failed=route['failed'],
+            )
+            report.append(row)
+        self.stdout.write(
+            f'Отправлено {stats["replayed"]}, пропущено {stats["skipped"]} '
+            f'за {stats["duration"]:.1f} с; наибольшее отставание от '
+            f'расписания {stats["lag"] * 1000:.0f} мс.'
+        )
+        if options['json']:
+            with open(options['json'], 'w', encoding='utf-8') as file:
+                json.dump(
+                    {**stats, 'routes': report}, file,
+                    ensure_ascii=False, indent=2,
+                )
@@ -0,0 +1,148 @@
+import logging
+from datetime import timedelta
+from time import sleep
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from reviews.constants import (
+    EMAIL_LEASE_TIME,
+    EMAIL_MAX_ATTEMPTS,
+    EMAIL_RETRY_DELAY,
+)
+from reviews.models import OutgoingEmail
+
+BATCH_SIZE = 100
+# Наибольшая пауза между попытками подключиться к почтовому серверу.
+MAX_BACKOFF = 300
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Команда для отправки писем из очереди."""
+
+    help = 'Отправляет письма из очереди через одно SMTP-соединение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько писем забирать из очереди за раз.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help=('Пауза в секундах между проходами по очереди. '
+                  'При 0 команда завершается, разобрав очередь.'),
+        )
+
+    def claim(self, batch_size):
+        """Забирает пачку писем из очереди в короткой транзакции.
+
+        Попытка засчитывается сразу, а следующая назначается через
+        EMAIL_LEASE_TIME: пока аренда не истекла, письма не достанутся
+        другому отправителю, а если процесс упадёт во время отправки,
+        письма вернутся в очередь.
+        """
+        with transaction.atomic():
+            emails = list(
+                OutgoingEmail.objects.due().select_for_update(
+                    skip_locked=True
+                )[:batch_size]
+            )
+            lease = timezone.now() + timedelta(seconds=EMAIL_LEASE_TIME)
+            for email in emails:
+                email.attempts += 1
+                email.next_attempt_at = lease
+            OutgoingEmail.objects.bulk_update(
+                emails, ('attempts', 'next_attempt_at')
+            )
+        return emails
+
+    def send_batch(self, mail_connection, batch_size):
+        """Отправляет одну пачку писем, возвращает (отправлено, ошибок).
+
+        SMTP не держит транзакцию и блокировки строк: письма забираются
+        в одной короткой транзакции, а результаты записываются в другой.
+        """
+        sent = failed = 0
+        emails = self.claim(batch_size)
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.recipient],
+                connection=mail_connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                email.last_error = str(error)
+                email.next_attempt_at = timezone.now() + timedelta(
+                    seconds=EMAIL_RETRY_DELAY * 2 ** (email.attempts - 1)
+                )
+                failed += 1
+                if email.attempts >= EMAIL_MAX_ATTEMPTS:
+                    logger.error(
+                        'Письмо %s для %s не отправлено за %s попыток: %s',
+                        email.pk, email.recipient, email.attempts, error
+                    )
+                    email.body = ''
+            else:
+                email.sent_at = timezone.now()
+                email.last_error = ''
+                # В тексте код подтверждения: после отправки он не нужен.
+                email.body = ''
+                sent += 1
+        OutgoingEmail.objects.bulk_update(
+            emails, ('sent_at', 'next_attempt_at', 'last_error', 'body')
+        )
+        return sent, failed
+
+    def drain(self, batch_size):
+        """Разбирает очередь до конца, переиспользуя соединение."""
+        total_sent = total_failed = 0
+        if not OutgoingEmail.objects.due().exists():
+            return total_sent, total_failed
+        with get_connection(fail_silently=False) as mail_connection:
+            while True:
+                sent, failed = self.send_batch(mail_connection, batch_size)
+                if not sent and not failed:
+                    break
+                total_sent += sent
+                total_failed += failed
+        return total_sent, total_failed
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        delay = interval
+        while True:
+            try:
+                sent, failed = self.drain(options['batch_size'])
+            except OSError as error:
+                if not interval:
+                    raise CommandError(
+                        f'Не удалось подключиться к почтовому серверу: {error}'
+                    )
+                # Сервер недоступен: пауза растёт, пока он не вернётся.
+                delay = min(delay * 2, max(interval, MAX_BACKOFF))
+                logger.warning(
+                    'Не удалось подключиться к почтовому серверу: %s. '
+                    'Следующая попытка через %.0f с.', error, delay
+                )
+                sleep(delay)
+                continue
+            delay = interval
+            if sent or failed:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}. С ошибкой: {failed}.'
+                )
+            if not interval:
+                break
+            sleep(interval)
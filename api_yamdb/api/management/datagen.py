@@ -0,0 +1,148 @@
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, reset_queries
+from django.db.models import Max
+
+from reviews.constants import MAX_SCORE, MIN_SCORE
+from reviews.models import Category, Genre, User
+from reviews.validators import validate_username
+
+WORDS = (
+    'война', 'мир', 'любовь', 'море', 'город', 'ночь', 'дорога', 'зима',
+    'река', 'песня', 'время', 'звезда', 'сад', 'огонь', 'память', 'ветер',
+    'дом', 'путь', 'тень', 'свет', 'голос', 'остров', 'лес', 'небо',
+)
+SCORES = range(MIN_SCORE, MAX_SCORE + 1)
+# Оценки смещены вверх, как обычно и бывает в отзывах.
+SCORE_WEIGHTS = (2, 1, 1, 2, 3, 5, 8, 11, 10, 8)
+
+
+def batches(objects, size):
+    """Разбивает поток объектов на списки не длиннее size."""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, size))
+        if not batch:
+            return
+        yield batch
+
+
+def words(rng, count):
+    return ' '.join(rng.choices(WORDS, k=count))
+
+
+def zipf_rank(rng, n, exponent):
+    """Ранг 0..n-1 с вероятностью, убывающей как 1 / (ранг + 1) ** s.
+
+    Обратное преобразование непрерывного степенного распределения:
+    O(1) по времени и памяти, без таблицы весов на n элементов.
+    """
+    u = rng.random()
+    if exponent == 1:
+        x = n ** u
+    else:
+        x = ((n ** (1 - exponent) - 1) * u + 1) ** (1 / (1 - exponent))
+    return min(int(x), n) - 1
+
+
+def distinct_ranks(rng, n, count, exponent):
+    """count разных рангов из 0..n-1 со степенным перекосом.
+
+    Когда хвост распределения почти не выпадает, недостающие ранги
+    добираются равномерно.
+    """
+    if count * 2 > n:
+        return rng.sample(range(n), count)
+    ranks = set()
+    for _ in range(count * 8):
+        ranks.add(zipf_rank(rng, n, exponent))
+        if len(ranks) == count:
+            return ranks
+    while len(ranks) < count:
+        ranks.add(rng.randrange(n))
+    return ranks
+
+
+class BulkInserter:
+    """bulk_create пачками с заранее назначенными первичными ключами.
+
+    Ключи идут подряд после наибольшего существующего, поэтому связанные
+    объекты можно строить сразу, не перечитывая вставленные строки
+    и не полагаясь на то, вернёт ли база ключи из bulk_create.
+    Пока идёт генерация, в эти таблицы не должен писать никто другой.
+    finish() сдвигает последовательности ключей (нужно PostgreSQL).
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.next_pks = {}
+
+    def insert(self, model, batch):
+        """Вставляет пачку; возвращает диапазон назначенных ключей."""
+        first = self.next_pks.get(model)
+        if first is None:
+            first = (
+                model.objects.aggregate(last=Max('pk'))['last'] or 0
+            ) + 1
+        for pk, obj in enumerate(batch, first):
+            obj.pk = pk
+        model.objects.bulk_create(batch)
+        self.next_pks[model] = first + len(batch)
+        # С DEBUG=True журнал запросов держал бы SQL всех пачек.
+        reset_queries()
+        return range(first, first + len(batch))
+
+    def create(self, model, objects):
+        """Вставляет поток объектов; возвращает диапазон их ключей."""
+        first = last = None
+        for batch in batches(objects, self.batch_size):
+            pks = self.insert(model, batch)
+            first = pks.start if first is None else first
+            last = pks.stop
+        if first is None:
+            return range(0)
+        return range(first, last)
+
+    def finish(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), list(self.next_pks)
+        )
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+
+def create_users(inserter, rng, prefix, count):
+    """Пользователи prefix_0, prefix_1...; возвращает диапазон ключей."""
+    # Вход по паролю им не нужен; хэш считается один раз на всех.
+    password = make_password(None)
+
+    def users():
+        for i in range(count):
+            username = f'{prefix}_{i}'
+            validate_username(username)
+            yield User(
+                username=username,
+                email=f'{username}@{prefix}.example.com',
+                password=password,
+                bio=words(rng, rng.randrange(6)),
+            )
+
+    return inserter.create(User, users())
+
+
+def create_catalog(inserter, prefix, categories, genres):
+    """Категории и жанры; возвращает диапазоны их ключей."""
+    return (
+        inserter.create(Category, (
+            Category(name=f'Категория {i}', slug=f'{prefix}-category-{i}')
+            for i in range(categories)
+        )),
+        inserter.create(Genre, (
+            Genre(name=f'Жанр {i}', slug=f'{prefix}-genre-{i}')
+            for i in range(genres)
+        )),
+    )
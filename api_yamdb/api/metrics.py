@@ -0,0 +1,149 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+MILLISECOND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+METRIC_BUCKETS = {
+    'queries': QUERY_BUCKETS,
+    'db_ms': MILLISECOND_BUCKETS,
+    'serializer_ms': MILLISECOND_BUCKETS,
+    'view_ms': MILLISECOND_BUCKETS,
+}
+
+current_request = ContextVar('current_request', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: SQL-запросы и время по этапам."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.view_time = 0.0
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'db_ms': self.db_time * 1000,
+            'serializer_ms': self.serializer_time * 1000,
+            'view_ms': self.view_time * 1000,
+        }
+
+
+def count_queries(execute, sql, params, many, context):
+    """Обёртка выполнения SQL: считает запросы текущего запроса."""
+    metrics = current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += perf_counter() - start
+
+
+def install_query_counter(connection, **kwargs):
+    """Подключает count_queries к соединению один раз."""
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@contextmanager
+def measure_serializer():
+    """Учитывает время сериализации; вложенные вызовы не суммируются."""
+    metrics = current_request.get()
+    if metrics is None or metrics.serializer_depth:
+        yield
+        return
+    metrics.serializer_depth += 1
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += perf_counter() - start
+        metrics.serializer_depth -= 1
+
+
+class TimedSerializerMixin:
+    """Сериализатор, время которого попадает в метрики запроса."""
+
+    def to_representation(self, instance):
+        with measure_serializer():
+            return super().to_representation(instance)
+
+
+class Histogram:
+    """Гистограмма с фиксированными верхними границами корзин."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def as_dict(self):
+        count = sum(self.counts)
+        buckets = {
+            f'le_{bound}': bucket_count
+            for bound, bucket_count in zip(self.bounds, self.counts)
+        }
+        buckets['inf'] = self.counts[-1]
+        return {
+            'count': count,
+            'sum': self.total,
+            'mean': self.total / count if count else None,
+            'buckets': buckets,
+        }
+
+
+class RouteStats:
+    """Гистограммы метрик по маршрутам в памяти процесса."""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def add(self, route, metrics, budget_exceeded=False):
+        values = metrics.as_dict()
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = {
+                    'budget_exceeded': 0,
+                    'histograms': {
+                        name: Histogram(bounds)
+                        for name, bounds in METRIC_BUCKETS.items()
+                    },
+                }
+            stats['budget_exceeded'] += budget_exceeded
+            for name, histogram in stats['histograms'].items():
+                histogram.add(values[name])
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                route: {
+                    'budget_exceeded': stats['budget_exceeded'],
+                    **{
+                        name: histogram.as_dict()
+                        for name, histogram in stats['histograms'].items()
+                    },
+                }
+                for route, stats in sorted(self._routes.items())
+            }
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_stats = RouteStats()
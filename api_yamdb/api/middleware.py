@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import os
+from time import perf_counter, time
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from api.metrics import (
+    RequestMetrics, current_request, install_query_counter, route_stats
+)
+from api.traces import get_trace_writer, sanitize_params
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """Маршрут выполнил больше SQL-запросов, чем ему разрешено."""
+
+
+class QueryMetricsMiddleware:
+    """Метрики запросов по именам маршрутов.
+
+    Для каждого запроса считаются SQL-запросы, время в базе, время
+    сериализации и время представления; они попадают в гистограммы
+    route_stats. QUERY_BUDGETS задаёт лимит запросов для пары «метод
+    маршрут», например «GET titles-list»: превышение пишется в лог,
+    а при QUERY_BUDGET_RAISE — исключение. QUERY_METRICS_HEADER
+    добавляет метрики в заголовки ответа. Middleware стоит последним,
+    чтобы мерить только представление.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Так Django отличает асинхронные middleware.
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics, token = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request.reset(token)
+        return self.finish(request, response, metrics)
+
+    def start(self):
+        install_query_counter(connection)
+        metrics = RequestMetrics()
+        metrics.started = perf_counter()
+        return metrics, current_request.set(metrics)
+
+    def finish(self, request, response, metrics):
+        metrics.view_time = perf_counter() - metrics.started
+        request.query_metrics = metrics
+        route = getattr(request.resolver_match, 'url_name', None)
+        if route is None:
+            return response
+        budget = settings.QUERY_BUDGETS.get(f'{request.method} {route}')
+        exceeded = budget is not None and metrics.queries > budget
+        route_stats.add(route, metrics, exceeded)
+        if settings.QUERY_METRICS_HEADER:
+            response['X-Query-Count'] = metrics.queries
+            response['Server-Timing'] = (
+                f'db;dur={metrics.db_time * 1000:.2f}, '
+                f'serializer;dur={metrics.serializer_time * 1000:.2f}, '
+                f'view;dur={metrics.view_time * 1000:.2f}'
+            )
+        if exceeded:
+            message = (
+                f'{request.method} {route}: {metrics.queries} SQL-запросов '
+                f'при лимите {budget}.'
+            )
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class TraceCaptureMiddleware:
+    """Запись трассы запросов в JSONL-файлы по TRACE_CAPTURE_PATH.
+
+    Каждый процесс пишет в свой файл (см. process_trace_path).
+
+    На каждый запрос к известному маршруту пишется метод, имя маршрута,
+    путь, параметры строки запроса без секретов, статус, задержка
+    и число SQL-запросов. Тело, заголовки и токены не сохраняются,
+    только признак авторизации. Запись идёт через фоновый TraceWriter.
+    Middleware стоит первым, чтобы задержка включала весь стек.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.TRACE_CAPTURE_PATH:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.writer = get_trace_writer(
+            settings.TRACE_CAPTURE_PATH, settings.TRACE_BUFFER_SIZE
+        )
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timestamp, started = time(), perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, timestamp, started)
+        return response
+
+    async def __acall__(self, request):
+        timestamp, started = time(), perf_counter()
+        response = await self.get_response(request)
+        self.record(request, response, timestamp, started)
+        return response
+
+    def record(self, request, response, timestamp, started):
+        latency = perf_counter() - started
+        match = request.resolver_match
+        if match is None:
+            return
+        if self.writer.pid != os.getpid():
+            # Middleware создан до fork рабочего процесса (gunicorn
+            # --preload): поток писателя остался в родителе.
+            self.writer = get_trace_writer(
+                settings.TRACE_CAPTURE_PATH, settings.TRACE_BUFFER_SIZE
+            )
+        metrics = getattr(request, 'query_metrics', None)
+        self.writer.record({
+            'ts': timestamp,
+            'method': request.method,
+            'route': match.url_name,
+            'path': request.path,
+            'kwargs': match.kwargs,
+            'params': sanitize_params(request.GET),
+            'authenticated': 'HTTP_AUTHORIZATION' in request.META,
+            'status': response.status_code,
+            'latency_ms': latency * 1000,
+            'queries': metrics.queries if metrics is not None else None,
+        })
@@ -0,0 +1,113 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from urllib.parse import parse_qs, urlencode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """Пагинация limit/offset с опциональным keyset-курсором.
+
+    По умолчанию работает как LimitOffsetPagination. Если в запросе передан
+    `pagination=cursor` или `cursor=<токен>`, страница выбирается по ключу
+    (pub_date, id) без OFFSET и без COUNT(*): стоимость любой страницы
+    равна стоимости первой. Формат ответа count/next/previous/results
+    сохраняется, `count` в этом режиме равен None.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    mode_cursor = 'cursor'
+    position_field = 'pub_date'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            request.query_params.get(self.mode_query_param)
+            == self.mode_cursor
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.count = None
+        position, self.reverse = self.decode_cursor(request)
+
+        field = self.position_field
+        if self.reverse:
+            queryset = queryset.order_by(field, 'id')
+            lookup = 'gt'
+        else:
+            queryset = queryset.order_by(f'-{field}', '-id')
+            lookup = 'lt'
+        if position is not None:
+            value, pk = position
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value})
+                | Q(**{field: value, f'id__{lookup}': pk})
+            )
+
+        results = list(queryset[:self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+        if self.reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            querystring = urlsafe_b64decode(encoded.encode('ascii'))
+            tokens = parse_qs(querystring.decode('ascii'))
+            value = parse_datetime(tokens['p'][0])
+            pk = int(tokens['i'][0])
+            reverse = tokens.get('r', ['0'])[0] == '1'
+        except (BinasciiError, KeyError, TypeError, UnicodeError,
+                ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (value, pk), reverse
+
+    def encode_cursor(self, obj, reverse):
+        tokens = {
+            'p': getattr(obj, self.position_field).isoformat(),
+            'i': obj.pk,
+        }
+        if reverse:
+            tokens['r'] = '1'
+        encoded = urlsafe_b64encode(
+            urlencode(tokens).encode('ascii')
+        ).decode('ascii')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
@@ -1,10 +1,14 @@
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
 from django.http import Http404
 from rest_framework import serializers
 
+from api.metrics import TimedSerializerMixin
 from reviews.constants import MAX_NAME_LENGTH, MAX_TEXT_LENGTH
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from reviews.models import (
+    Category, Comment, Genre, OutgoingEmail, Review, Title, User
+)
 from reviews.models import validate_username
 
 
@@ -20,23 +24,41 @@ class SignUpSerializer(serializers.Serializer):
     def create(self, validated_data):
         email = validated_data['email']
         username = validated_data['username']
-        user, _ = User.objects.get_or_create(email=email, username=username)
-        confirmation_code = default_token_generator.make_token(user)
-        send_mail(
-            subject='Код подтверждения YaMDb',
-            message=f'Ваш код подтверждения: {confirmation_code}',
-            from_email='from@yamdb.com',
-            recipient_list=[email],
-            fail_silently=False,
-        )
+        with transaction.atomic():
+            user = validated_data.get('user')
+            if user is None:
+                # INSERT ... ON CONFLICT DO NOTHING: одновременная
+                # регистрация с теми же данными не приводит к IntegrityError.
+                User.objects.bulk_create(
+                    [User(email=email, username=username)],
+                    ignore_conflicts=True
+                )
+                user = self.get_user(email, username)
+            confirmation_code = default_token_generator.make_token(user)
+            # Письмо отправит команда send_emails, запрос его не ждёт.
+            OutgoingEmail.objects.create(
+                recipient=email,
+                from_email='from@yamdb.com',
+                subject='Код подтверждения YaMDb',
+                body=f'Ваш код подтверждения: {confirmation_code}',
+            )
         return user
 
-    def validate(self, data):
-        email = data.get('email')
-        username = data.get('username')
-
-        user_by_email = User.objects.filter(email=email).first()
-        user_by_username = User.objects.filter(username=username).first()
+    def get_user(self, email, username):
+        """Находит пользователя по email и username одним запросом.
+
+        Возвращает None, если таких нет, и ошибку валидации, если email
+        и username заняты разными пользователями.
+        """
+        users = User.objects.filter(
+            Q(email=email) | Q(username=username)
+        )[:2]
+        user_by_email = next(
+            (user for user in users if user.email == email), None
+        )
+        user_by_username = next(
+            (user for user in users if user.username == username), None
+        )
 
         # Если оба существуют, но это разные юзеры — ошибка
         if user_by_email and user_by_username and (
@@ -58,6 +80,10 @@ class SignUpSerializer(serializers.Serializer):
                 'username': 'Имя пользователя уже занято другим адресом.'
             })
 
+        return user_by_email
+
+    def validate(self, data):
+        data['user'] = self.get_user(data.get('email'), data.get('username'))
         return data
 
 
@@ -83,7 +109,7 @@ class TokenSerializer(serializers.Serializer):
         return data
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор модели User."""
     class Meta:
         model = User
@@ -97,21 +123,21 @@ class MeSerializer(UserSerializer):
         read_only_fields = ('role',)
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели Category."""
     class Meta:
         model = Category
         fields = ('name', 'slug')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для модели Genre."""
     class Meta:
         model = Genre
         fields = ('name', 'slug')
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Базовый сериализатор для модели Title."""
     rating = serializers.IntegerField(read_only=True, default=None)
 
@@ -154,40 +180,44 @@ class TitleWriteSerializer(TitleSerializer):
         return TitleReadSerializer(instance).data
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор модели Review."""
-    author = serializers.SlugRelatedField(
-        'username',
-        read_only=False,
-        queryset=User.objects.all(),
-        default=serializers.CurrentUserDefault())
+    author = serializers.SlugRelatedField('username', read_only=True)
 
     class Meta:
         model = Review
         fields = ('id', 'text', 'author', 'score', 'pub_date')
 
-    def validate(self, data):
-        request = self.context['request']
-        if request.method == 'POST':
-            title_id = self.context['view'].kwargs.get('title_id')
-            author = request.user
-            if Review.objects.filter(title__id=title_id,
-                                     author=author).exists():
-                raise serializers.ValidationError(
-                    'Вы уже оставили отзыв на это произведение.'
-                )
-        return data
-
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор модели Comment."""
-    author = serializers.SlugRelatedField(
-        'username',
-        read_only=False,
-        queryset=User.objects.all(),
-        default=serializers.CurrentUserDefault()
-    )
+    author = serializers.SlugRelatedField('username', read_only=True)
 
     class Meta:
         model = Comment
         fields = ('id', 'text', 'author', 'pub_date')
+
+
+class ReviewBulkItemSerializer(serializers.ModelSerializer):
+    """Элемент пакетной загрузки отзывов.
+
+    Произведение и автор проверяются сразу для всей пачки, поэтому
+    здесь это просто id и username.
+    """
+    title = serializers.IntegerField()
+    author = serializers.CharField(max_length=MAX_NAME_LENGTH, required=False)
+
+    class Meta:
+        model = Review
+        fields = ('title', 'text', 'score', 'author')
+        validators = []
+
+
+class CommentBulkItemSerializer(serializers.ModelSerializer):
+    """Элемент пакетной загрузки комментариев."""
+    review = serializers.IntegerField()
+    author = serializers.CharField(max_length=MAX_NAME_LENGTH, required=False)
+
+    class Meta:
+        model = Comment
+        fields = ('review', 'text', 'author')
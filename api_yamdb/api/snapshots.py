@@ -0,0 +1,78 @@
+import hashlib
+import json
+import threading
+from time import monotonic
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_KEY = 'catalog-snapshot-version:{label}'
+
+
+class CatalogSnapshot:
+    """Сериализованный список объектов и хэш его содержимого."""
+
+    def __init__(self, version, items):
+        self.version = version
+        self.items = items
+        self.expires = monotonic() + settings.CATALOG_SNAPSHOT_TIMEOUT
+        self.digest = hashlib.sha1(
+            json.dumps(items, ensure_ascii=False, sort_keys=True).encode()
+        ).hexdigest()
+
+    def etag(self, params):
+        """Сильный ETag для конкретного набора параметров запроса."""
+        query = json.dumps(sorted(params.lists()), ensure_ascii=False)
+        return '"{}"'.format(
+            hashlib.sha1(f'{self.digest}:{query}'.encode()).hexdigest()
+        )
+
+
+class SnapshotStore:
+    """Снимки почти статичных списков в памяти процесса.
+
+    Номер версии хранится в кэше Django, поэтому при общем кэше
+    инвалидация видна всем процессам. Снимок пересобирается, когда
+    версия изменилась или прошло CATALOG_SNAPSHOT_TIMEOUT секунд: с кэшем
+    в памяти процесса (LocMemCache) другие процессы узнают об изменениях
+    только так.
+    """
+
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def get_version(self, label):
+        return cache.get(VERSION_KEY.format(label=label), 0)
+
+    def is_fresh(self, snapshot, version):
+        return (
+            snapshot is not None and snapshot.version == version
+            and snapshot.expires > monotonic()
+        )
+
+    def get(self, label, build):
+        version = self.get_version(label)
+        snapshot = self._snapshots.get(label)
+        if self.is_fresh(snapshot, version):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshots.get(label)
+            if not self.is_fresh(snapshot, version):
+                snapshot = CatalogSnapshot(version, build())
+                self._snapshots[label] = snapshot
+        return snapshot
+
+    def invalidate(self, label):
+        key = VERSION_KEY.format(label=label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+    def clear(self):
+        with self._lock:
+            self._snapshots.clear()
+
+
+snapshots = SnapshotStore()
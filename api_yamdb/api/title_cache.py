@@ -0,0 +1,149 @@
+import hashlib
+import json
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+GENERATION_KEY = 'titles:generation'
+LIST_VERSION_KEY = 'titles:{generation}:list-version'
+WRITES_KEY = 'titles:{generation}:writes'
+TITLE_VERSION_KEY = 'titles:{generation}:version:{pk}'
+LIST_KEY = 'titles:{generation}:list:{version}:{params}'
+DETAIL_KEY = 'titles:{generation}:detail:{pk}'
+
+
+class TitleCache:
+    """Кэш сериализованных страниц и карточек произведений.
+
+    Каждая запись помечена версиями тех произведений, которые в неё вошли,
+    а страницы списка — ещё и версией состава списка. Инвалидация просто
+    удаляет ключ версии: следующий читатель получит новую версию, и старые
+    записи перестанут с ней совпадать. Бэкенд задаётся TITLE_CACHE_ALIAS.
+
+    Версии произведений на странице известны только после запроса к базе,
+    поэтому страницу списка дополнительно сторожит общая для всех
+    произведений версия записей: она читается до запроса и меняется при
+    каждой инвалидации.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.TITLE_CACHE_ALIAS]
+
+    def get_versions(self, keys):
+        """Текущие версии по ключам; недостающие создаются."""
+        versions = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in versions]
+        for key in missing:
+            self.cache.add(key, uuid4().hex, timeout=None)
+        if missing:
+            versions.update(self.cache.get_many(missing))
+        return versions
+
+    def get_generation(self):
+        return self.get_versions([GENERATION_KEY])[GENERATION_KEY]
+
+    def title_version_keys(self, generation, pks):
+        return [
+            TITLE_VERSION_KEY.format(generation=generation, pk=pk)
+            for pk in pks
+        ]
+
+    def list_key(self, generation, params):
+        version_key = LIST_VERSION_KEY.format(generation=generation)
+        version = self.get_versions([version_key])[version_key]
+        params = hashlib.sha1(
+            json.dumps(sorted(params), ensure_ascii=False).encode()
+        ).hexdigest()
+        return LIST_KEY.format(
+            generation=generation, version=version, params=params
+        )
+
+    def is_fresh(self, generation, title_versions):
+        keys = self.title_version_keys(generation, title_versions)
+        current = self.get_versions(keys)
+        return all(
+            current[key] == version
+            for key, version in zip(keys, title_versions.values())
+        )
+
+    def get_list(self, params):
+        """Возвращает (данные или None, токен для последующего set).
+
+        params — пары (параметр, значения), их порядок не важен.
+
+        Версии списка и записей читаются до запроса к базе, поэтому
+        страница, собранная во время параллельного изменения, не попадёт
+        в кэш или уже не совпадёт с версией.
+        """
+        generation = self.get_generation()
+        writes_key = WRITES_KEY.format(generation=generation)
+        writes = self.get_versions([writes_key])[writes_key]
+        key = self.list_key(generation, params)
+        token = (generation, key, writes)
+        entry = self.cache.get(key)
+        if entry is not None:
+            data, title_versions = entry
+            if self.is_fresh(generation, title_versions):
+                return data, token
+        return None, token
+
+    def set_list(self, token, data, pks):
+        generation, key, writes = token
+        keys = self.title_version_keys(generation, pks)
+        versions = self.get_versions(keys)
+        # Проверка идёт после чтения версий: _invalidate меняет версию
+        # записей раньше, чем удаляет версии произведений.
+        if self.cache.get(WRITES_KEY.format(generation=generation)) != writes:
+            return
+        title_versions = {
+            pk: versions[version_key] for pk, version_key in zip(pks, keys)
+        }
+        self.cache.set(
+            key, (data, title_versions), settings.TITLE_CACHE_TIMEOUT
+        )
+
+    def get_detail(self, pk):
+        """Возвращает (данные или None, токен для последующего set)."""
+        generation = self.get_generation()
+        version_key = self.title_version_keys(generation, [pk])[0]
+        version = self.get_versions([version_key])[version_key]
+        key = DETAIL_KEY.format(generation=generation, pk=pk)
+        entry = self.cache.get(key)
+        if entry is not None and entry[1] == version:
+            return entry[0], (key, version)
+        return None, (key, version)
+
+    def set_detail(self, token, data):
+        key, version = token
+        self.cache.set(key, (data, version), settings.TITLE_CACHE_TIMEOUT)
+
+    def _invalidate(self, titles=(), lists=False, everything=False):
+        if everything:
+            self.cache.delete(GENERATION_KEY)
+            return
+        generation = self.get_generation()
+        self.cache.set(
+            WRITES_KEY.format(generation=generation), uuid4().hex,
+            timeout=None
+        )
+        keys = self.title_version_keys(generation, titles)
+        if lists:
+            keys.append(LIST_VERSION_KEY.format(generation=generation))
+        self.cache.delete_many(keys)
+
+    def invalidate(self, titles=(), lists=False, everything=False):
+        """Сбрасывает версии после фиксации текущей транзакции.
+
+        titles — произведения, чьё представление изменилось; lists —
+        изменился состав или порядок списков; everything — всё сразу.
+        """
+        titles = list(titles)
+        transaction.on_commit(
+            lambda: self._invalidate(titles, lists, everything)
+        )
+
+
+title_cache = TitleCache()
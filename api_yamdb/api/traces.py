@@ -0,0 +1,159 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+
+SENSITIVE_PARAMS = ('password', 'token', 'code', 'secret', 'email')
+MASK = '***'
+MAX_PARAM_LENGTH = 200
+WRITE_BATCH = 500
+STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def sanitize_params(params):
+    """Параметры строки запроса без секретов и слишком длинных значений."""
+    return {
+        key: MASK if any(word in key.lower() for word in SENSITIVE_PARAMS)
+        else [value[:MAX_PARAM_LENGTH] for value in values]
+        for key, values in params.lists()
+    }
+
+
+def process_trace_path(path):
+    """Файл трассы текущего процесса: traces.jsonl -> traces.<pid>.jsonl.
+
+    Каждый процесс пишет в свой файл, иначе пачки записей нескольких
+    рабочих процессов сервера перемешивались бы внутри строк.
+    """
+    root, extension = os.path.splitext(path)
+    return f'{root}.{os.getpid()}{extension}'
+
+
+def trace_files(path):
+    """Файлы трассы всех процессов, записанной с TRACE_CAPTURE_PATH=path."""
+    root, extension = os.path.splitext(path)
+    files = sorted(glob.glob(f'{glob.escape(root)}.*{extension}'))
+    if os.path.isfile(path):
+        files.append(path)
+    return files
+
+
+class TraceWriter:
+    """Дописывает записи трассы в JSONL-файл из фонового потока.
+
+    record() только кладёт запись в очередь и не ждёт диска; поток
+    забирает накопившиеся записи пачкой и пишет их одним вызовом.
+    Если очередь заполнена, запись отбрасывается и учитывается в dropped:
+    трасса не должна замедлять обработку запросов. Об отброшенных
+    записях и ошибках записи поток сообщает в лог и продолжает работу.
+    """
+
+    def __init__(self, path, buffer_size):
+        self.path = path
+        self.pid = os.getpid()
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.failed = 0
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self.thread = threading.Thread(
+            target=self.run, name='trace-writer', daemon=True
+        )
+        self.thread.start()
+        atexit.register(self.close)
+
+    def record(self, entry):
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        file = None
+        while True:
+            entries = [self.queue.get()]
+            while len(entries) < WRITE_BATCH:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                file = self.write(file, [
+                    entry for entry in entries if entry is not STOP
+                ])
+            finally:
+                for _ in entries:
+                    self.queue.task_done()
+            self.report_dropped()
+            if any(entry is STOP for entry in entries):
+                if file is not None:
+                    file.close()
+                return
+
+    def write(self, file, entries):
+        """Дописывает записи; возвращает открытый файл или None.
+
+        Несериализуемая запись пропускается, при ошибке ввода-вывода
+        теряется пачка, а файл откроется заново со следующей.
+        """
+        lines = []
+        for entry in entries:
+            try:
+                lines.append(json.dumps(entry, ensure_ascii=False) + '\n')
+            except (TypeError, ValueError) as error:
+                self.failed += 1
+                logger.error('Запись трассы пропущена: %s', error)
+        if not lines:
+            return file
+        try:
+            if file is None:
+                file = open(self.path, 'a', encoding='utf-8')
+            file.writelines(lines)
+            file.flush()
+        except OSError as error:
+            self.failed += len(lines)
+            logger.error(
+                'Не удалось записать в трассу %s: %s', self.path, error
+            )
+            if file is not None:
+                file.close()
+            return None
+        return file
+
+    def report_dropped(self):
+        dropped = self.dropped
+        if dropped > self.reported_dropped:
+            logger.warning(
+                'Очередь трассы %s переполнена: отброшено записей %s '
+                '(всего %s).', self.path, dropped - self.reported_dropped,
+                dropped,
+            )
+            self.reported_dropped = dropped
+
+    def flush(self):
+        """Ждёт, пока все принятые записи окажутся в файле."""
+        self.queue.join()
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(STOP)
+            self.thread.join()
+        self.report_dropped()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_trace_writer(path, buffer_size):
+    """Общий писатель файла трассы текущего процесса."""
+    path = process_trace_path(path)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None or not writer.thread.is_alive():
+            writer = _writers[path] = TraceWriter(path, buffer_size)
+        return writer
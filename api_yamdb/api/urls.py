@@ -1,12 +1,17 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import with_async_reads
 from api.views import (
     CategoryViewSet,
+    CommentBulkView,
     CommentViewSet,
     GenreViewSet,
+    ReviewBulkView,
     ReviewViewSet,
     signup,
+    stats,
     TitleViewSet,
     token,
     UsersViewSet
@@ -30,8 +35,17 @@ v1_router.register(
 )
 v1_router.register('users', UsersViewSet, basename='users')
 
+v1_urls = v1_router.urls
+if settings.ASYNC_READ_VIEWS:
+    v1_urls = with_async_reads(v1_urls)
+
 urlpatterns = [
     path('v1/auth/signup/', signup, name='signup'),
     path('v1/auth/token/', token, name='token'),
-    path('v1/', include(v1_router.urls)),
+    path('v1/stats/', stats, name='stats'),
+    path('v1/reviews/bulk/', ReviewBulkView.as_view(), name='reviews-bulk'),
+    path(
+        'v1/comments/bulk/', CommentBulkView.as_view(), name='comments-bulk'
+    ),
+    path('v1/', include(v1_urls)),
 ]
@@ -1,15 +1,24 @@
-from django.db.models import Avg
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
 from django_filters.rest_framework import DjangoFilterBackend
-from django.shortcuts import get_object_or_404
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
 
-from api.baseclass import CategoryGenreBaseViewSet
+from api.baseclass import (
+    BulkCreateView,
+    CategoryGenreBaseViewSet,
+    ParentLookupMixin,
+)
 from api.filters import TitleFilter
+from api.metrics import route_stats
+from api.pagination import KeysetPagination
 from api.permissions import (
     IsAdmin,
     IsAdminOrReadOnly,
@@ -17,9 +26,11 @@ from api.permissions import (
 )
 from api.serializers import (
     CategorySerializer,
+    CommentBulkItemSerializer,
     CommentSerializer,
     GenreSerializer,
     MeSerializer,
+    ReviewBulkItemSerializer,
     ReviewSerializer,
     SignUpSerializer,
     TitleReadSerializer,
@@ -27,7 +38,8 @@ from api.serializers import (
     TokenSerializer,
     UserSerializer,
 )
-from reviews.models import Category, Genre, Review, Title, User
+from api.title_cache import title_cache
+from reviews.models import Category, Comment, Genre, Review, Title, User
 
 
 @api_view(['POST'])
@@ -51,6 +63,13 @@ def token(request):
     return Response({'token': str(token)}, status=status.HTTP_200_OK)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def stats(request):
+    """Гистограммы метрик запросов по маршрутам (в этом процессе)."""
+    return Response(route_stats.as_dict())
+
+
 class UsersViewSet(viewsets.ModelViewSet):
     """Представление для модели User."""
     queryset = User.objects.all()
@@ -61,10 +80,20 @@ class UsersViewSet(viewsets.ModelViewSet):
     search_fields = ('username',)
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            title_ids = list(
+                instance.reviews.values_list('title_id', flat=True)
+            )
+            instance.delete()
+            Title.objects.filter(pk__in=title_ids).recalculate_rating()
+            title_cache.invalidate(titles=title_ids)
+
     @action(detail=False, methods=['get', 'patch'],
             permission_classes=[IsAuthenticated])
     def me(self, request):
-        user = request.user
+        # request.user собран из кэша аутентификации и содержит не все поля.
+        user = User.objects.get(pk=request.user.pk)
         if request.method == 'GET':
             serializer = MeSerializer(user)
             return Response(serializer.data)
@@ -76,9 +105,9 @@ class UsersViewSet(viewsets.ModelViewSet):
 
 class TitleViewSet(viewsets.ModelViewSet):
     """Представление для объектов модели Title."""
-    queryset = Title.objects.all().annotate(
-        rating=Avg('reviews__score')
-    ).order_by('name')
+    queryset = Title.objects.select_related(
+        'category'
+    ).prefetch_related('genre').order_by('name')
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = LimitOffsetPagination
     filter_backends = (DjangoFilterBackend,)
@@ -90,6 +119,49 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleReadSerializer
         return TitleWriteSerializer
 
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        params = [('host', [request.get_host()])]
+        params.extend(request.query_params.lists())
+        data, token = title_cache.get_list(params)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        title_cache.set_list(
+            token, response.data,
+            [title['id'] for title in response.data['results']]
+        )
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            pk = int(kwargs[self.lookup_field])
+        except ValueError:
+            pk = None
+        if request.user.is_authenticated or pk is None:
+            return super().retrieve(request, *args, **kwargs)
+        data, token = title_cache.get_detail(pk)
+        if data is not None:
+            return Response(data)
+        response = super().retrieve(request, *args, **kwargs)
+        title_cache.set_detail(token, response.data)
+        return response
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        title_cache.invalidate(lists=True)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        title_cache.invalidate(titles=[serializer.instance.pk], lists=True)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            title_id = instance.pk
+            super().perform_destroy(instance)
+            title_cache.invalidate(titles=[title_id], lists=True)
+
 
 class CategoryViewSet(CategoryGenreBaseViewSet):
     """Представление для объектов модели Category."""
@@ -103,37 +175,161 @@ class GenreViewSet(CategoryGenreBaseViewSet):
     serializer_class = GenreSerializer
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ParentLookupMixin, viewsets.ModelViewSet):
     """Представление для ревью."""
     serializer_class = ReviewSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetPagination
     permission_classes = (IsAuthorOrAdminOrModeratorOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_parent_queryset(self):
+        return Title.objects.filter(id=self.kwargs.get('title_id'))
+
     def get_title(self):
-        return get_object_or_404(Title, id=self.kwargs.get('title_id'))
+        return self.get_parent()
 
     def get_queryset(self):
-        return self.get_title().reviews.all()
+        return Review.objects.filter(
+            title_id=self.kwargs.get('title_id')
+        ).select_related('author')
 
     def perform_create(self, serializer):
-        serializer.save(title=self.get_title())
+        try:
+            with transaction.atomic():
+                review = serializer.save(
+                    author=self.request.user, title=self.get_title()
+                )
+                Title.objects.filter(pk=review.title_id).update_rating(
+                    review.score, 1
+                )
+        except IntegrityError:
+            # Повторный отзыв отсекает unique_together, без SELECT заранее;
+            # SELECT нужен только здесь, чтобы не скрыть другие ошибки.
+            if not Review.objects.filter(
+                title=self.get_title(), author=self.request.user
+            ).exists():
+                raise
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Вы уже оставили отзыв на это произведение.'
+                ]
+            })
+        title_cache.invalidate(titles=[review.title_id])
+
+    @staticmethod
+    def lock_score(review):
+        """Блокирует строку отзыва и перечитывает его оценку.
+
+        Объект мог быть загружен до параллельного PATCH или DELETE, поэтому
+        сдвиг рейтинга считается от оценки в базе, а не в объекте.
+        """
+        return Review.objects.select_for_update().filter(
+            pk=review.pk
+        ).values_list('score', flat=True).first()
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            old_score = self.lock_score(serializer.instance)
+            if old_score is None:
+                # Иначе save() не найдёт строку и вставит отзыв заново.
+                raise NotFound()
+            review = serializer.save()
+            if review.score != old_score:
+                Title.objects.filter(pk=review.title_id).update_rating(
+                    review.score - old_score
+                )
+                title_cache.invalidate(titles=[review.title_id])
 
-class CommentViewSet(viewsets.ModelViewSet):
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            score = self.lock_score(instance)
+            _, deleted = instance.delete()
+            if deleted.get(Review._meta.label):
+                Title.objects.filter(pk=instance.title_id).update_rating(
+                    -score, -1
+                )
+                title_cache.invalidate(titles=[instance.title_id])
+
+
+class CommentViewSet(ParentLookupMixin, viewsets.ModelViewSet):
     """Представление для комментариев."""
     serializer_class = CommentSerializer
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetPagination
     permission_classes = (IsAuthorOrAdminOrModeratorOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
 
+    def get_parent_queryset(self):
+        return Review.objects.filter(
+            title__id=self.kwargs.get('title_id'),
+            id=self.kwargs.get('review_id')
+        )
+
     def get_review(self):
-        return get_object_or_404(Review,
-                                 title__id=self.kwargs.get('title_id'),
-                                 id=self.kwargs.get('review_id'))
+        return self.get_parent()
 
     def get_queryset(self):
-        return self.get_review().comments.all()
+        return Comment.objects.filter(
+            review_id=self.kwargs.get('review_id'),
+            review__title_id=self.kwargs.get('title_id')
+        ).select_related('author')
 
     def perform_create(self, serializer):
-        serializer.save(review=self.get_review())
+        serializer.save(author=self.request.user, review=self.get_review())
+
+
+class ReviewBulkView(BulkCreateView):
+    """Пакетная загрузка отзывов на произведения."""
+    model = Review
+    item_serializer_class = ReviewBulkItemSerializer
+    serializer_class = ReviewSerializer
+    parent_field = 'title'
+    parent_not_found = 'Произведение не найдено.'
+
+    def get_parent_queryset(self):
+        return Title.objects.only('pk')
+
+    def check_items(self, items, errors):
+        # Пары (произведение, автор) проверяются одним запросом.
+        existing = set(Review.objects.filter(
+            title__in={item['title'] for item in items.values()},
+            author__in={item['author'] for item in items.values()},
+        ).values_list('title_id', 'author_id'))
+        for index, item in list(items.items()):
+            pair = (item['title'].pk, item['author'].pk)
+            if pair in existing:
+                self.fail(
+                    items, errors, index, api_settings.NON_FIELD_ERRORS_KEY,
+                    'Отзыв этого автора на произведение уже существует.'
+                )
+            existing.add(pair)
+
+    def perform_bulk_create(self, objs):
+        Review.objects.bulk_create(objs)
+        # bulk_create возвращает ключи не на всех базах: они перечитываются
+        # по уникальной паре (произведение, автор).
+        pks = {
+            (title, author): pk
+            for title, author, pk in Review.objects.filter(
+                title__in={review.title_id for review in objs},
+                author__in={review.author_id for review in objs},
+            ).values_list('title_id', 'author_id', 'pk')
+        }
+        deltas = defaultdict(lambda: (0, 0))
+        for review in objs:
+            review.pk = pks[(review.title_id, review.author_id)]
+            score_sum, count = deltas[review.title_id]
+            deltas[review.title_id] = (score_sum + review.score, count + 1)
+        Title.objects.update_ratings(deltas)
+        title_cache.invalidate(titles=deltas)
+
+
+class CommentBulkView(BulkCreateView):
+    """Пакетная загрузка комментариев к отзывам."""
+    model = Comment
+    item_serializer_class = CommentBulkItemSerializer
+    serializer_class = CommentSerializer
+    parent_field = 'review'
+    parent_not_found = 'Отзыв не найден.'
+
+    def get_parent_queryset(self):
+        return Review.objects.only('pk')
@@ -0,0 +1,126 @@
+import queue
+import threading
+
+from django.db.backends.postgresql import base, creation
+from psycopg2 import extensions
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def is_alive(connection):
+    """Проверяет соединение psycopg2 запросом SELECT 1."""
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except base.Database.Error:
+        return False
+    return True
+
+
+def close_pool(key):
+    """Убирает пул по ключу (alias, имя базы) и закрывает его соединения."""
+    with _pools_lock:
+        pool = _pools.pop(key, None)
+    while pool is not None:
+        try:
+            connection, _ = pool.get_nowait()
+        except queue.Empty:
+            break
+        connection.close()
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Перед удалением тестовой базы закрывает её пул соединений."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Соединения в пуле остаются открытыми, и DROP DATABASE не прошёл
+        # бы, пока они подключены к тестовой базе.
+        close_pool((self.connection.alias, test_database_name))
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой соединений и пулом в памяти процесса.
+
+    Дополнительные ключи в DATABASES:
+
+    CONN_HEALTH_CHECKS — постоянное соединение (CONN_MAX_AGE) проверяется
+    перед первым использованием в каждом запросе, и разорванное
+    соединение открывается заново вместо ошибки в запросе.
+
+    POOL_SIZE — сколько соединений держать в пуле процесса. Закрытое
+    Django соединение возвращается в пул, если в нём нет открытой
+    транзакции и ошибок, и достаётся следующим потоком вместо нового
+    подключения. 0 отключает пул.
+    """
+
+    creation_class = DatabaseCreation
+    health_check_done = False
+    pool_key = None
+
+    def get_pool(self, key):
+        size = self.settings_dict.get('POOL_SIZE') or 0
+        if not size:
+            return None
+        with _pools_lock:
+            return _pools.setdefault(key, queue.LifoQueue(size))
+
+    def get_new_connection(self, conn_params):
+        # Тестовая база подключается к другой базе под тем же alias.
+        self.pool_key = (self.alias, conn_params['database'])
+        pool = self.get_pool(self.pool_key)
+        while pool is not None:
+            try:
+                connection, isolation_level = pool.get_nowait()
+            except queue.Empty:
+                break
+            if (
+                not self.settings_dict.get('CONN_HEALTH_CHECKS')
+                or is_alive(connection)
+            ):
+                self.isolation_level = isolation_level
+                return connection
+            connection.close()
+        return super().get_new_connection(conn_params)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and self.settings_dict.get('CONN_HEALTH_CHECKS')
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            if not self.is_usable():
+                self.close()
+            self.health_check_done = True
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Вызывается в начале и в конце запроса: следующий запрос
+        # проверит соединение заново.
+        self.health_check_done = False
+
+    def _close(self):
+        pool = self.get_pool(self.pool_key)
+        if (
+            pool is not None
+            and not self.errors_occurred
+            and not self.connection.closed
+            and self.connection.info.transaction_status
+            == extensions.TRANSACTION_STATUS_IDLE
+        ):
+            try:
+                pool.put_nowait((self.connection, self.isolation_level))
+            except queue.Full:
+                pass
+            else:
+                return
+        super()._close()
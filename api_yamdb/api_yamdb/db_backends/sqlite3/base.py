@@ -0,0 +1,16 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, настроенный через PRAGMA из настроек базы.
+
+    Ключ PRAGMAS в DATABASES — словарь «имя: значение», который
+    выполняется для каждого нового соединения, например journal_mode WAL,
+    synchronous NORMAL, mmap_size и busy_timeout.
+    """
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
@@ -1,5 +1,8 @@
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -28,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.TraceCaptureMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -35,6 +39,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'api_yamdb.urls'
@@ -60,13 +65,55 @@ WSGI_APPLICATION = 'api_yamdb.wsgi.application'
 
 
 # Database
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Задаётся переменными окружения. DB_ENGINE=postgresql включает PostgreSQL
+# с постоянными соединениями (DB_CONN_MAX_AGE, секунды), их проверкой
+# (DB_CONN_HEALTH_CHECKS) и необязательным пулом (DB_POOL_SIZE; с пулом
+# обычно ставят DB_CONN_MAX_AGE=0, и соединение возвращается в пул после
+# каждого запроса). По умолчанию — SQLite, настроенный для одного узла.
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite3')
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', 60))
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'api_yamdb.db_backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'yamdb'),
+            'USER': os.getenv('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': (
+                os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true'
+            ),
+            'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', 0)),
+        }
     }
-}
+elif DB_ENGINE == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'api_yamdb.db_backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'PRAGMAS': {
+                # Читатели не ждут писателя, fsync только на checkpoint.
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'mmap_size': 256 * 1024 * 1024,
+                # Отрицательное значение — размер кэша страниц в КиБ.
+                'cache_size': -64 * 1024,
+                'temp_store': 'MEMORY',
+                # Миллисекунды ожидания блокировки вместо «database is locked».
+                'busy_timeout': 5000,
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(
+        f'Неизвестный DB_ENGINE: {DB_ENGINE}. '
+        'Допустимые значения: sqlite3, postgresql.'
+    )
 
 AUTH_USER_MODEL = 'reviews.User'
 
@@ -109,7 +156,7 @@ STATICFILES_DIRS = ((BASE_DIR / 'static/'),)
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',
@@ -118,5 +165,79 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
 }
 
+# Cache
+# В продакшене default нужно заменить на общий бэкенд (Redis, Memcached),
+# чтобы инвалидация была видна всем процессам.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+TITLE_CACHE_ALIAS = 'default'
+TITLE_CACHE_TIMEOUT = 300
+
+# Снимки списков категорий и жанров (api/snapshots.py) живут в памяти
+# процесса. Сразу инвалидация видна всем процессам только при общем
+# кэше (Redis, Memcached); с LocMemCache — не позже чем через TIMEOUT.
+
+CATALOG_SNAPSHOT_TIMEOUT = 60
+
+# Кэш пользователей для JWT-аутентификации (в памяти процесса).
+# Изменения пользователя сбрасывают кэш только в своём процессе, в других
+# смена роли или блокировка заметна не позже чем через TTL секунд.
+
+JWT_USER_CACHE_MAX_SIZE = 10000
+JWT_USER_CACHE_TTL = 15
+
+# Асинхронное чтение произведений, отзывов и комментариев под ASGI
+# (включается переменной ASYNC_READ_VIEWS=true). Число потоков ограничивает
+# и число соединений с базой у такого чтения.
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'false').lower() == 'true'
+ASYNC_READ_WORKERS = int(os.getenv('ASYNC_READ_WORKERS', 16))
+
+# Максимум объектов в одном запросе пакетной загрузки отзывов и комментариев
+
+BULK_MAX_ITEMS = 100
+
+# Метрики запросов по маршрутам (статистика: /api/v1/stats/)
+# QUERY_BUDGETS — сколько SQL-запросов разрешено запросу «метод маршрут»
+# с учётом загрузки пользователя при промахе кэша аутентификации;
+# превышение пишется в лог, а при QUERY_BUDGET_RAISE (в тестах) —
+# исключение.
+
+QUERY_METRICS_HEADER = (
+    os.getenv('QUERY_METRICS_HEADER', 'false').lower() == 'true'
+)
+QUERY_BUDGET_RAISE = False
+QUERY_BUDGETS = {
+    'GET titles-list': 4,
+    'GET titles-detail': 3,
+    'GET categories-list': 2,
+    'GET genres-list': 2,
+    'GET reviews-list': 3,
+    'GET reviews-detail': 2,
+    'GET comments-list': 3,
+    'GET comments-detail': 2,
+    'POST reviews-list': 5,
+    'POST comments-list': 3,
+    'POST reviews-bulk': 7,
+    # Комментарии вставляются одним bulk_create, если база возвращает
+    # ключи вставленных строк; на SQLite они сохраняются по одному: у
+    # комментария нет естественного ключа, чтобы перечитать строки.
+    'POST comments-bulk': (
+        4 if DB_ENGINE == 'postgresql' else BULK_MAX_ITEMS + 4
+    ),
+}
+
+# Трасса запросов для команды replay_traces: JSONL-файл, куда
+# дописываются записи (пусто — запись выключена), и сколько записей может
+# ждать фоновой записи, прежде чем новые начнут отбрасываться.
+
+TRACE_CAPTURE_PATH = os.getenv('TRACE_CAPTURE_PATH', '')
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', 10000))
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth import get_user_model
 
-from .models import Category, Comment, Genre, Review, Title
+from .models import Category, Comment, Genre, OutgoingEmail, Review, Title
 
 User = get_user_model()
 
@@ -12,3 +12,15 @@ admin.site.register(Genre)
 admin.site.register(Title)
 admin.site.register(Review)
 admin.site.register(Comment)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    """Очередь писем без текста: в нём код подтверждения."""
+    list_display = ('recipient', 'subject', 'attempts', 'next_attempt_at',
+                    'sent_at')
+    list_filter = ('sent_at',)
+    search_fields = ('recipient',)
+    fields = ('recipient', 'from_email', 'subject', 'created_at',
+              'next_attempt_at', 'attempts', 'sent_at', 'last_error')
+    readonly_fields = ('created_at',)
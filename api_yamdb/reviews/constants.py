@@ -5,3 +5,7 @@ MAX_CODE_LENGTH = 50
 MAX_ROLE_LENGTH = 50
 MAX_SCORE = 10
 MIN_SCORE = 1
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_DELAY = 60
+# Сколько секунд забранное письмо не выдаётся другим отправителям.
+EMAIL_LEASE_TIME = 600
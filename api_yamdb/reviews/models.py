@@ -1,9 +1,15 @@
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from django.db.models import TextChoices
+from django.db import connections, models
+from django.db.models import (
+    Case, Count, F, OuterRef, Q, Subquery, Sum, TextChoices, Value, When
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from reviews.constants import (
+    EMAIL_MAX_ATTEMPTS,
     MAX_NAME_LENGTH,
     MAX_ROLE_LENGTH,
     MAX_SCORE,
@@ -11,6 +17,14 @@ from reviews.constants import (
     MAX_TITLE_LENGTH,
     MAX_TEXT_LENGTH,
 )
+from reviews.search import (
+    fts5_query,
+    search_words,
+    TITLE_FTS_TABLE,
+    TSQUERY_SQL,
+    tsquery,
+    tsvector,
+)
 from reviews.validators import validate_year, validate_username
 
 
@@ -94,6 +108,9 @@ class CategoryGenre(models.Model):
     class Meta:
         abstract = True
         ordering = ('name',)
+        indexes = (
+            models.Index(fields=('name',), name='%(class)s_name_idx'),
+        )
 
     def __str__(self):
         return self.name
@@ -113,6 +130,111 @@ class Genre(CategoryGenre):
         verbose_name_plural = 'Жанры произведений'
 
 
+class TitleQuerySet(models.QuerySet):
+    """Запросы к произведениям с поддержкой хранимого рейтинга."""
+
+    @staticmethod
+    def _actual_rating_expressions():
+        reviews = Review.objects.filter(
+            title=OuterRef('pk')
+        ).order_by().values('title')
+        return {
+            'score_sum': Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0
+            ),
+            'reviews_count': Coalesce(
+                Subquery(reviews.annotate(total=Count('id')).values('total')),
+                0
+            ),
+        }
+
+    def update_rating(self, score_delta, count_delta=0):
+        """Сдвигает сумму оценок и число отзывов одним UPDATE."""
+        return self.update(
+            score_sum=F('score_sum') + score_delta,
+            reviews_count=F('reviews_count') + count_delta,
+        )
+
+    def update_ratings(self, deltas):
+        """Сдвигает рейтинг нескольких произведений одним UPDATE.
+
+        deltas — словарь {pk: (изменение суммы оценок, изменение числа
+        отзывов)}.
+        """
+        def delta(position):
+            return Case(
+                *(When(pk=pk, then=Value(values[position]))
+                  for pk, values in deltas.items()),
+                default=Value(0),
+                output_field=models.IntegerField(),
+            )
+        return self.filter(pk__in=deltas).update_rating(delta(0), delta(1))
+
+    def with_actual_rating(self):
+        """Аннотирует фактические сумму оценок и число отзывов."""
+        expressions = self._actual_rating_expressions()
+        return self.annotate(
+            actual_score_sum=expressions['score_sum'],
+            actual_reviews_count=expressions['reviews_count'],
+        )
+
+    def with_rating_drift(self):
+        """Произведения, у которых хранимый рейтинг разошёлся с отзывами."""
+        return self.with_actual_rating().exclude(
+            score_sum=F('actual_score_sum'),
+            reviews_count=F('actual_reviews_count'),
+        )
+
+    def recalculate_rating(self):
+        """Пересчитывает хранимый рейтинг по таблице отзывов."""
+        return self.update(**self._actual_rating_expressions())
+
+    def search(self, text, column=None):
+        """Полнотекстовый поиск по названию и описанию.
+
+        Каждое слово запроса ищется как префикс. Релевантность
+        доступна в аннотации search_rank: чем больше, тем выше.
+        """
+        words = search_words(text)
+        if not words:
+            return self.none().annotate(search_rank=Value(0.0))
+        table = self.model._meta.db_table
+        vendor = connections[self.db].vendor
+        if vendor == 'sqlite':
+            query = fts5_query(words, column)
+            return self.filter(pk__in=RawSQL(
+                f'SELECT rowid FROM "{TITLE_FTS_TABLE}" '
+                f'WHERE "{TITLE_FTS_TABLE}" MATCH %s',
+                (query,),
+            )).annotate(search_rank=RawSQL(
+                f'SELECT -bm25("{TITLE_FTS_TABLE}") FROM "{TITLE_FTS_TABLE}" '
+                f'WHERE "{TITLE_FTS_TABLE}" MATCH %s '
+                f'AND rowid = "{table}"."id"',
+                (query,), output_field=models.FloatField(),
+            ))
+        if vendor == 'postgresql':
+            document = tsvector(table, column)
+            query = tsquery(words)
+            return self.filter(pk__in=RawSQL(
+                f'SELECT "id" FROM "{table}" '
+                f'WHERE {document} @@ {TSQUERY_SQL}',
+                (query,),
+            )).annotate(search_rank=RawSQL(
+                f'ts_rank({document}, {TSQUERY_SQL})',
+                (query,), output_field=models.FloatField(),
+            ))
+        lookups = Q()
+        for word in words:
+            if column:
+                lookups &= Q(**{f'{column}__icontains': word})
+            else:
+                lookups &= (
+                    Q(name__icontains=word) | Q(description__icontains=word)
+                )
+        return self.filter(lookups).annotate(search_rank=Value(0.0))
+
+
 class Title(models.Model):
     """Модель Произведения."""
     name = models.CharField(
@@ -141,16 +263,38 @@ class Title(models.Model):
         null=True,
         verbose_name='Категория'
     )
+    score_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Сумма оценок'
+    )
+    reviews_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество отзывов'
+    )
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         default_related_name = 'titles'
         ordering = ('name',)
+        indexes = (
+            models.Index(fields=('name',), name='title_name_idx'),
+            models.Index(fields=('year', 'name'), name='title_year_name_idx'),
+        )
 
     def __str__(self):
         return self.name
 
+    @property
+    def rating(self):
+        if not self.reviews_count:
+            return None
+        return self.score_sum / self.reviews_count
+
 
 class TitleGenre(models.Model):
     """Связь жанра и Произведения."""
@@ -211,6 +355,12 @@ class Review(models.Model):
         default_related_name = 'reviews'
         unique_together = ('title', 'author')
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('title', '-pub_date', '-id'),
+                name='review_title_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:MAX_TITLE_LENGTH]
@@ -241,6 +391,79 @@ class Comment(models.Model):
         verbose_name_plural = 'Комментарии'
         default_related_name = 'comments'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('review', '-pub_date', '-id'),
+                name='comment_review_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:MAX_TITLE_LENGTH]
+
+
+class OutgoingEmailQuerySet(models.QuerySet):
+
+    def due(self):
+        """Неотправленные письма, для которых подошло время попытки."""
+        return self.filter(
+            sent_at__isnull=True,
+            attempts__lt=EMAIL_MAX_ATTEMPTS,
+            next_attempt_at__lte=timezone.now(),
+        )
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку."""
+    recipient = models.EmailField(
+        max_length=MAX_TEXT_LENGTH,
+        verbose_name='Получатель'
+    )
+    from_email = models.EmailField(
+        max_length=MAX_TEXT_LENGTH,
+        verbose_name='Отправитель'
+    )
+    subject = models.CharField(
+        max_length=MAX_TITLE_LENGTH,
+        verbose_name='Тема'
+    )
+    body = models.TextField(
+        verbose_name='Текст письма'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата добавления'
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Количество попыток'
+    )
+    sent_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Дата отправки'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+
+    objects = OutgoingEmailQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ('next_attempt_at', 'id')
+        indexes = (
+            models.Index(
+                fields=('sent_at', 'next_attempt_at'),
+                name='outgoing_email_due_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.recipient}: {self.subject}'
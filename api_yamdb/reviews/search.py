@@ -0,0 +1,40 @@
+"""Полнотекстовый поиск по произведениям.
+
+На SQLite используется внешняя FTS5-таблица TITLE_FTS_TABLE, которую
+триггеры синхронизируют с таблицей произведений. На PostgreSQL поиск идёт
+по выражению to_tsvector, для которого миграция строит GIN-индекс.
+"""
+import re
+
+TITLE_FTS_TABLE = 'reviews_title_fts'
+SEARCH_CONFIG = 'simple'
+WORD_RE = re.compile(r'\w+')
+TSQUERY_SQL = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+
+
+def search_words(text):
+    """Слова поискового запроса без спецсимволов синтаксиса FTS."""
+    return WORD_RE.findall(text or '')
+
+
+def fts5_query(words, column=None):
+    """Запрос FTS5: все слова, каждое как префикс."""
+    query = ' '.join(f'"{word}"*' for word in words)
+    if column:
+        return f'{column} : ({query})'
+    return query
+
+
+def tsquery(words):
+    """Запрос to_tsquery: все слова, каждое как префикс."""
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def tsvector(table, column=None):
+    """Выражение to_tsvector, совпадающее с индексами из миграции."""
+    if column:
+        return f"to_tsvector('{SEARCH_CONFIG}', \"{table}\".\"{column}\")"
+    return (
+        f"to_tsvector('{SEARCH_CONFIG}', "
+        f"\"{table}\".\"name\" || ' ' || \"{table}\".\"description\")"
+    )
@@ -1,25 +1,78 @@
 import re
+import time
 
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+YEAR_REFRESH_INTERVAL = 60
+
+
+class CurrentYear:
+    """Текущий год, который не вычисляется при каждой проверке.
+
+    Год пересчитывается не реже раза в refresh_interval секунд и сразу
+    после наступления нового года по timezone.now().
+    """
+
+    def __init__(self, refresh_interval=YEAR_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.year = None
+        self.expires_at = 0.0
+
+    def get(self):
+        now = time.time()
+        if now >= self.expires_at:
+            current = timezone.now()
+            new_year = current.replace(
+                year=current.year + 1, month=1, day=1,
+                hour=0, minute=0, second=0, microsecond=0,
+            )
+            self.year = current.year
+            self.expires_at = min(
+                now + self.refresh_interval, new_year.timestamp()
+            )
+        return self.year
+
+
+current_year = CurrentYear()
+
 
 def validate_year(value):
     """Проверка года создания произведения."""
-    current_year = timezone.now().year
-    if value > current_year:
+    if value > current_year.get():
         raise ValidationError(
             'Год создания не может быть больше текущего!',
         )
     return value
 
 
+def find_invalid_years(values):
+    """Индексы значений, не прошедших validate_year.
+
+    Текущий год берётся один раз на всю колонку.
+    """
+    upper_bound = current_year.get()
+    return [index for index, value in enumerate(values) if value > upper_bound]
+
+
+USERNAME_RE = re.compile(r'[\w.@+-]+')
+# Все варианты регистра, в которых имя совпадает с «me».
+FORBIDDEN_USERNAMES = frozenset(('me', 'Me', 'mE', 'ME'))
+
+
 def validate_username(value):
     """Проверка имени пользователя."""
-    if value.lower() == 'me':
+    if value in FORBIDDEN_USERNAMES:
         raise ValidationError('Имя <me> запрещено.')
-    if not re.fullmatch(r'^[\w.@+-]+$', value):
+    if USERNAME_RE.fullmatch(value) is None:
         raise ValidationError(
             'Имя пользователя содержит недопустимые символы. '
             'Разрешены только буквы, цифры и символы @/./+/-/_'
         )
+
+
+# Пакетные версии валидаторов полей: принимают колонку значений
+# и возвращают индексы ошибочных.
+BATCH_VALIDATORS = {
+    validate_year: find_invalid_years,
+}
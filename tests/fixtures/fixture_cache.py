@@ -0,0 +1,13 @@
+import pytest
+from api.authentication import user_cache
+from api.snapshots import snapshots
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Кэши в памяти процесса не должны переживать очистку базы."""
+    cache.clear()
+    snapshots.clear()
+    user_cache.clear()
+    yield
@@ -0,0 +1,10 @@
+import pytest
+from api.metrics import route_stats
+
+
+@pytest.fixture(autouse=True)
+def query_budget(settings):
+    """В тестах превышение лимита SQL-запросов маршрута — ошибка."""
+    settings.QUERY_BUDGET_RAISE = True
+    route_stats.clear()
+    yield
@@ -1,8 +1,16 @@
 from http import HTTPStatus
+from importlib import import_module
 
 import pytest
 from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from reviews.constants import EMAIL_MAX_ATTEMPTS
+from reviews.models import OutgoingEmail
 
 from tests.utils import (
     invalid_data_for_user_patch_and_creation,
@@ -10,6 +18,37 @@ from tests.utils import (
 )
 
 
+class FailingEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+
+    def open(self):
+        raise ConnectionRefusedError('SMTP не отвечает')
+
+    def send_messages(self, email_messages):
+        raise AssertionError('Соединение не было открыто.')
+
+
+class StopSending(Exception):
+    pass
+
+
+class LeaseCheckingEmailBackend(BaseEmailBackend):
+    """Запоминает, в каком состоянии очередь во время отправки."""
+
+    checks = []
+
+    def send_messages(self, email_messages):
+        self.checks.append(
+            (connection.in_atomic_block, OutgoingEmail.objects.due().count())
+        )
+        return len(email_messages)
+
+
 @pytest.mark.django_db(transaction=True)
 class Test00UserRegistration:
     URL_SIGNUP = '/api/v1/auth/signup/'
@@ -112,6 +151,11 @@ class Test00UserRegistration:
         }
 
         response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert len(mail.outbox) == outbox_before_count, (
+            f'Проверьте, что POST-запрос к `{self.URL_SIGNUP}` не отправляет '
+            'письмо синхронно, а ставит его в очередь.'
+        )
+        call_command('send_emails')
         outbox_after = mail.outbox  # email outbox after user create
 
         assert response.status_code != HTTPStatus.NOT_FOUND, (
@@ -274,10 +318,11 @@ class Test00UserRegistration:
             ', возвращает ответ со статусом 400.'
         )
 
-    def test_00_registration_me_username_restricted(self, client):
+    @pytest.mark.parametrize('username', ('me', 'Me', 'mE', 'ME'))
+    def test_00_registration_me_username_restricted(self, client, username):
         valid_data = {
             'email': 'valid@yamdb.fake',
-            'username': 'me'
+            'username': username
         }
         response = client.post(self.URL_SIGNUP, data=valid_data)
         assert response.status_code == HTTPStatus.BAD_REQUEST, (
@@ -375,3 +420,147 @@ class Test00UserRegistration:
             'пользователя, созданного администратором,  возвращает ответ '
             'со статусом 200.'
         )
+
+    def test_signup_email_retried_after_failure(self, client, settings):
+        valid_data = {
+            'email': 'retry@yamdb.fake',
+            'username': 'retry_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+
+        settings.EMAIL_BACKEND = (
+            'tests.test_00_user_registration.FailingEmailBackend'
+        )
+        call_command('send_emails')
+        email = OutgoingEmail.objects.get(recipient=valid_data['email'])
+        assert email.sent_at is None and email.attempts == 1, (
+            'Проверьте, что письмо, которое не удалось отправить, остаётся '
+            'в очереди для повторной попытки.'
+        )
+        assert email.last_error
+
+        settings.EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+        OutgoingEmail.objects.update(next_attempt_at=email.created_at)
+        outbox_before_count = len(mail.outbox)
+        call_command('send_emails')
+        email.refresh_from_db()
+        assert email.sent_at is not None
+        assert len(mail.outbox) == outbox_before_count + 1
+        assert mail.outbox[-1].to == [valid_data['email']]
+
+    def test_signup_email_sent_outside_transaction(self, client, settings):
+        for index in range(2):
+            client.post(self.URL_SIGNUP, data={
+                'email': f'lease{index}@yamdb.fake',
+                'username': f'lease_username_{index}',
+            })
+        settings.EMAIL_BACKEND = (
+            'tests.test_00_user_registration.LeaseCheckingEmailBackend'
+        )
+        LeaseCheckingEmailBackend.checks.clear()
+
+        call_command('send_emails')
+        assert LeaseCheckingEmailBackend.checks == [(False, 0), (False, 0)], (
+            'Проверьте, что письма отправляются вне транзакции, а забранные '
+            'письма не выдаются другим отправителям до конца аренды.'
+        )
+        assert not OutgoingEmail.objects.filter(sent_at__isnull=True).exists()
+
+    def test_send_emails_backs_off_when_server_down(self, client, settings,
+                                                    monkeypatch):
+        client.post(self.URL_SIGNUP, data={
+            'email': 'down@yamdb.fake', 'username': 'down_username'
+        })
+        settings.EMAIL_BACKEND = (
+            'tests.test_00_user_registration.UnreachableEmailBackend'
+        )
+        with pytest.raises(CommandError):
+            call_command('send_emails')
+
+        delays = []
+
+        def sleep(seconds):
+            delays.append(seconds)
+            if len(delays) == 3:
+                raise StopSending
+
+        monkeypatch.setattr(
+            import_module('api.management.commands.send_emails'),
+            'sleep', sleep
+        )
+        with pytest.raises(StopSending):
+            call_command('send_emails', '--interval', 5)
+        assert delays == [10, 20, 40], (
+            'Проверьте, что при недоступном почтовом сервере команда '
+            'send_emails с --interval продолжает работу, увеличивая паузу.'
+        )
+        assert OutgoingEmail.objects.get().attempts == 0
+
+    def test_confirmation_code_not_kept(self, client, settings, caplog,
+                                        user_superuser):
+        for index in range(2):
+            client.post(self.URL_SIGNUP, data={
+                'email': f'purge{index}@yamdb.fake',
+                'username': f'purge_username_{index}',
+            })
+        failing, delivered = OutgoingEmail.objects.order_by('pk')
+        code = failing.body.rsplit(' ', 1)[-1]
+        admin_client = Client()
+        admin_client.force_login(user_superuser)
+        response = admin_client.get(
+            f'/admin/reviews/outgoingemail/{failing.pk}/change/'
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert code not in response.content.decode(), (
+            'Проверьте, что админка не показывает код подтверждения.'
+        )
+
+        settings.EMAIL_BACKEND = (
+            'django.core.mail.backends.locmem.EmailBackend'
+        )
+        OutgoingEmail.objects.filter(pk=failing.pk).update(
+            attempts=EMAIL_MAX_ATTEMPTS
+        )
+        call_command('send_emails')
+        delivered.refresh_from_db()
+        assert delivered.sent_at is not None and delivered.body == '', (
+            'Проверьте, что после отправки текст письма с кодом стирается.'
+        )
+
+        settings.EMAIL_BACKEND = (
+            'tests.test_00_user_registration.FailingEmailBackend'
+        )
+        OutgoingEmail.objects.filter(pk=failing.pk).update(
+            attempts=EMAIL_MAX_ATTEMPTS - 1
+        )
+        call_command('send_emails')
+        failing.refresh_from_db()
+        assert failing.sent_at is None and failing.body == ''
+        assert f'Письмо {failing.pk} для purge0@yamdb.fake' in caplog.text, (
+            'Проверьте, что письмо, исчерпавшее попытки, попадает в лог.'
+        )
+
+    def test_repeated_signup_single_user_query(self, client,
+                                               django_user_model):
+        valid_data = {
+            'email': 'repeat@yamdb.fake',
+            'username': 'repeat_username'
+        }
+        response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(self.URL_SIGNUP, data=valid_data)
+        assert response.status_code == HTTPStatus.OK
+        user_queries = [
+            query for query in context.captured_queries
+            if 'reviews_user' in query['sql']
+        ]
+        assert len(user_queries) == 1, (
+            f'Проверьте, что повторный POST-запрос к `{self.URL_SIGNUP}` '
+            'находит пользователя одним запросом.'
+        )
+        assert django_user_model.objects.filter(
+            username=valid_data['username']
+        ).count() == 1
@@ -1,6 +1,8 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (
     check_pagination, invalid_data_for_user_patch_and_creation
@@ -564,3 +566,55 @@ class Test01UserAPI:
             f'Проверьте, что PATCH-запрос к `{self.USERS_ME_URL}` с ключом '
             '`role` не изменяет роль пользователя.'
         )
+
+    def test_11_01_authenticated_read_skips_users_table(self, user_client):
+        user_client.get('/api/v1/titles/')
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.get('/api/v1/titles/')
+        assert response.status_code == HTTPStatus.OK
+        assert not any(
+            'reviews_user' in query['sql'] for query in context.captured_queries
+        ), (
+            'Проверьте, что повторный запрос авторизованного пользователя '
+            'не обращается к таблице пользователей.'
+        )
+
+    def test_11_02_role_change_invalidates_auth_cache(self, user_client, user,
+                                                      admin_client):
+        response = user_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        response = admin_client.patch(
+            f'{self.USERS_URL}{user.username}/', data={'role': 'admin'}
+        )
+        assert response.status_code == HTTPStatus.OK
+
+        response = user_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после изменения роли пользователя через '
+            f'`{self.USERS_URL}<username>/` новые права применяются сразу.'
+        )
+
+        admin_client.delete(f'{self.USERS_URL}{user.username}/')
+        response = user_client.get(self.USERS_ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED, (
+            'Проверьте, что токен удалённого пользователя перестаёт работать.'
+        )
+
+    def test_11_03_model_changes_invalidate_auth_cache(self, user_client,
+                                                       user):
+        response = user_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.FORBIDDEN
+
+        user.role = 'admin'
+        user.save()
+        response = user_client.get(self.USERS_URL)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что сохранение пользователя вне API (админка, '
+            'shell) сразу сбрасывает кэш аутентификации.'
+        )
+
+        user.is_active = False
+        user.save()
+        response = user_client.get(self.USERS_ME_URL)
+        assert response.status_code == HTTPStatus.UNAUTHORIZED
@@ -1,6 +1,8 @@
 from http import HTTPStatus
 
 import pytest
+from api import snapshots as snapshots_module
+from reviews.models import Category
 
 from tests.utils import (
     check_name_and_slug_patterns, check_pagination, check_permissions,
@@ -153,3 +155,53 @@ class Test02CategoryAPI:
                           HTTPStatus.FORBIDDEN)
         check_permissions(moderator_client, self.CATEGORY_URL, data,
                           'модератора', categories, HTTPStatus.FORBIDDEN)
+
+    def test_06_category_list_etag(self, client, admin_client,
+                                   django_assert_num_queries):
+        create_categories(admin_client)
+        response = client.get(self.CATEGORY_URL)
+        etag = response['ETag']
+        assert etag, (
+            f'Проверьте, что ответ на GET-запрос к `{self.CATEGORY_URL}` '
+            'содержит заголовок ETag.'
+        )
+
+        with django_assert_num_queries(0):
+            response = client.get(
+                self.CATEGORY_URL, HTTP_IF_NONE_MATCH=etag
+            )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+            'Проверьте, что при совпадении If-None-Match с ETag списка '
+            'категорий возвращается ответ со статусом 304.'
+        )
+
+        with django_assert_num_queries(0):
+            response = client.get(self.CATEGORY_URL, {'search': 'фил'})
+        assert response.json()['count'] == 1
+
+        admin_client.post(
+            self.CATEGORY_URL, data={'name': 'Музыка', 'slug': 'music'}
+        )
+        response = client.get(self.CATEGORY_URL, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            'Проверьте, что после добавления категории ETag списка меняется.'
+        )
+        assert response.json()['count'] == 3
+
+    def test_07_category_snapshot_expires(self, client, admin_client,
+                                          monkeypatch, settings):
+        now = [1000.0]
+        monkeypatch.setattr(snapshots_module, 'monotonic', lambda: now[0])
+        create_categories(admin_client)
+        assert client.get(self.CATEGORY_URL).json()['count'] == 2
+
+        # Так выглядит изменение из процесса, чья инвалидация сюда
+        # не доходит (кэш Django в памяти процесса).
+        Category.objects.create(name='Музыка', slug='music')
+        assert client.get(self.CATEGORY_URL).json()['count'] == 2
+
+        now[0] += settings.CATALOG_SNAPSHOT_TIMEOUT + 1
+        assert client.get(self.CATEGORY_URL).json()['count'] == 3, (
+            'Проверьте, что снимок списка категорий пересобирается по '
+            'истечении CATALOG_SNAPSHOT_TIMEOUT.'
+        )
@@ -1,6 +1,10 @@
+from datetime import datetime, timezone
 from http import HTTPStatus
 
 import pytest
+from api.title_cache import TitleCache, title_cache
+from reviews import validators
+from reviews.models import Category, Genre, Review, Title
 
 from tests.utils import (
     check_pagination, check_permissions, create_categories, create_genre,
@@ -353,3 +357,170 @@ class Test04TitleAPI:
             f'Проверьте, что PUT-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    @pytest.mark.parametrize('page_size', (1, 10, 50))
+    def test_07_titles_list_query_count(self, client, page_size,
+                                        django_assert_num_queries):
+        category = Category.objects.create(name='Фильм', slug='films')
+        genres = [
+            Genre.objects.create(name='Ужасы', slug='horror'),
+            Genre.objects.create(name='Комедия', slug='comedy'),
+        ]
+        for idx in range(page_size):
+            title = Title.objects.create(
+                name=f'Произведение {idx}', year=2000, category=category
+            )
+            title.genre.set(genres)
+
+        # COUNT(*) для пагинации, страница произведений с категориями
+        # и один запрос на жанры всех произведений страницы.
+        with django_assert_num_queries(3):
+            response = client.get(
+                self.TITLES_URL, {'limit': page_size, 'offset': 0}
+            )
+        assert response.status_code == HTTPStatus.OK
+        assert len(response.json()['results']) == page_size, (
+            f'Проверьте, что GET-запрос к `{self.TITLES_URL}` выполняет '
+            'фиксированное число SQL-запросов независимо от размера страницы.'
+        )
+
+        with django_assert_num_queries(2):
+            response = client.get(
+                self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=title.id)
+            )
+        assert response.status_code == HTTPStatus.OK
+
+    def test_08_titles_full_text_search(self, client, admin_client):
+        titles, _, genres = create_titles(admin_client)
+
+        response = client.get(self.TITLES_URL, {'search': 'back'})
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [titles[0]['id']], (
+            f'Проверьте, что параметр `search` для `{self.TITLES_URL}` ищет '
+            'по описанию произведения.'
+        )
+
+        response = client.get(self.TITLES_URL, {'name': 'креп'})
+        data = response.json()
+        assert [item['id'] for item in data['results']] == [titles[1]['id']], (
+            f'Проверьте, что параметр `name` для `{self.TITLES_URL}` ищет '
+            'произведения по началу слова в названии.'
+        )
+
+        response = client.get(self.TITLES_URL, {'genre': genres[0]['slug'][:3]})
+        assert response.json()['count'] == 0, (
+            'Проверьте, что фильтр `genre` требует точного совпадения slug.'
+        )
+
+        admin_client.patch(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id']),
+            data={'name': 'Бегущий человек'}
+        )
+        response = client.get(self.TITLES_URL, {'name': 'креп'})
+        assert response.json()['count'] == 0, (
+            'Проверьте, что поисковый индекс обновляется при изменении '
+            'произведения.'
+        )
+        response = client.get(self.TITLES_URL, {'search': 'бегущ'})
+        assert response.json()['count'] == 1
+
+        admin_client.delete(
+            self.TITLES_DETAIL_URL_TEMPLATE.format(title_id=titles[1]['id'])
+        )
+        response = client.get(self.TITLES_URL, {'search': 'бегущ'})
+        assert response.json()['count'] == 0, (
+            'Проверьте, что удалённое произведение исчезает из поиска.'
+        )
+
+        response = client.get(self.TITLES_URL, {'search': '"*)'})
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 0
+
+    def test_09_titles_anonymous_response_cache(self, client, admin_client,
+                                                user_client,
+                                                django_assert_num_queries):
+        titles, _, genres = create_titles(admin_client)
+        detail_url = self.TITLES_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        client.get(self.TITLES_URL)
+        client.get(detail_url)
+        with django_assert_num_queries(0):
+            response = client.get(self.TITLES_URL)
+            client.get(detail_url)
+        assert response.json()['count'] == 2, (
+            f'Проверьте, что повторный анонимный GET-запрос к '
+            f'`{self.TITLES_URL}` отдаётся из кэша.'
+        )
+
+        user_client.post(
+            f'{detail_url}reviews/', data={'text': 'Отлично', 'score': 8}
+        )
+        assert client.get(detail_url).json()['rating'] == 8, (
+            'Проверьте, что кэш карточки произведения сбрасывается при '
+            'добавлении отзыва.'
+        )
+        results = client.get(self.TITLES_URL).json()['results']
+        assert {item['id']: item['rating'] for item in results} == {
+            titles[0]['id']: 8, titles[1]['id']: None
+        }, (
+            'Проверьте, что кэш списка произведений сбрасывается при '
+            'добавлении отзыва.'
+        )
+
+        admin_client.delete(f'/api/v1/genres/{genres[0]["slug"]}/')
+        genre_slugs = [
+            genre['slug'] for genre in client.get(detail_url).json()['genre']
+        ]
+        assert genres[0]['slug'] not in genre_slugs, (
+            'Проверьте, что кэш произведения сбрасывается при удалении жанра.'
+        )
+        response = client.get(self.TITLES_URL, {'genre': genres[0]['slug']})
+        assert response.json()['count'] == 0
+
+        admin_client.patch(detail_url, data={'name': 'Терминатор 2'})
+        assert client.get(detail_url).json()['name'] == 'Терминатор 2'
+        admin_client.delete(detail_url)
+        assert client.get(self.TITLES_URL).json()['count'] == 1
+
+    def test_10_current_year_refreshed_at_rollover(self, monkeypatch):
+        now = datetime(2030, 12, 31, 23, 59, 59, tzinfo=timezone.utc)
+        monkeypatch.setattr(validators.timezone, 'now', lambda: now)
+        monkeypatch.setattr(
+            validators.time, 'time', lambda: now.timestamp()
+        )
+        current_year = validators.CurrentYear(refresh_interval=3600)
+        assert current_year.get() == 2030
+
+        now = datetime(2031, 1, 1, 0, 0, 1, tzinfo=timezone.utc)
+        assert current_year.get() == 2031, (
+            'Проверьте, что закэшированный год обновляется сразу после '
+            'наступления нового года.'
+        )
+
+    def test_11_titles_list_not_cached_after_concurrent_write(
+            self, client, admin_client, user, monkeypatch, settings):
+        settings.QUERY_BUDGET_RAISE = False
+        titles, _, _ = create_titles(admin_client)
+        set_list = TitleCache.set_list
+
+        def set_list_after_write(cache, token, data, pks):
+            # Отзыв фиксируется между запросом к базе и записью в кэш.
+            Review.objects.create(
+                title_id=titles[0]['id'], author=user, text='Отзыв', score=8
+            )
+            Title.objects.filter(pk=titles[0]['id']).update_rating(8, 1)
+            title_cache.invalidate(titles=[titles[0]['id']])
+            set_list(cache, token, data, pks)
+
+        monkeypatch.setattr(TitleCache, 'set_list', set_list_after_write)
+        client.get(self.TITLES_URL)
+        monkeypatch.setattr(TitleCache, 'set_list', set_list)
+
+        results = client.get(self.TITLES_URL).json()['results']
+        assert {item['id']: item['rating'] for item in results} == {
+            titles[0]['id']: 8, titles[1]['id']: None
+        }, (
+            'Проверьте, что страница списка, собранная до параллельного '
+            'изменения произведения, не сохраняется в кэш.'
+        )
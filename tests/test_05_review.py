@@ -1,7 +1,14 @@
 from http import HTTPStatus
 
 import pytest
+from api.serializers import ReviewSerializer
+from api.views import ReviewBulkView, ReviewViewSet
+from django.core.management import call_command
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import NotFound
+from reviews.models import Review, Title, TitleQuerySet, User
 
 from tests.utils import (
     check_fields, check_pagination, create_reviews, create_single_review,
@@ -413,3 +420,354 @@ class Test05ReviewAPI:
             f'Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    def test_07_review_rating_kept_in_sync(self, admin_client, admin,
+                                           user_client, user):
+        author_map = {
+            admin: admin_client,
+            user: user_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        title_url = self.TITLE_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id']
+        )
+        review_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=titles[0]['id'], review_id=reviews[0]['id']
+        )
+
+        response = admin_client.patch(review_url, data={'score': 1})
+        assert response.status_code == HTTPStatus.OK
+        assert admin_client.get(title_url).json().get('rating') == 3, (
+            'Проверьте, что после изменения оценки в отзыве рейтинг '
+            'произведения пересчитывается.'
+        )
+
+        response = admin_client.delete(review_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert admin_client.get(title_url).json().get('rating') == 5, (
+            'Проверьте, что после удаления отзыва рейтинг произведения '
+            'пересчитывается.'
+        )
+
+        response = user_client.delete(
+            self.REVIEW_DETAIL_URL_TEMPLATE.format(
+                title_id=titles[0]['id'], review_id=reviews[1]['id']
+            )
+        )
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert admin_client.get(title_url).json().get('rating') is None, (
+            'Проверьте, что у произведения без отзывов рейтинг равен `None`.'
+        )
+
+    def test_08_recalculate_rating_command(self, admin_client, admin,
+                                           user_client, user):
+        author_map = {
+            admin: admin_client,
+            user: user_client
+        }
+        _, titles = create_reviews(admin_client, author_map)
+        Title.objects.filter(pk=titles[0]['id']).update(
+            score_sum=0, reviews_count=0
+        )
+
+        call_command('recalculate_rating', dry_run=True)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.reviews_count) == (0, 0), (
+            'Проверьте, что с флагом `--dry-run` рейтинг не исправляется.'
+        )
+
+        call_command('recalculate_rating')
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.score_sum, title.reviews_count) == (10, 2), (
+            'Проверьте, что команда `recalculate_rating` исправляет '
+            'расхождения в хранимом рейтинге.'
+        )
+        assert not Title.objects.with_rating_drift().exists()
+
+    def test_09_reviews_cursor_pagination(self, admin_client, admin,
+                                          user_client, user,
+                                          moderator_client, moderator):
+        author_map = {
+            admin: admin_client,
+            user: user_client,
+            moderator: moderator_client
+        }
+        reviews, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        expected_ids = [review['id'] for review in reversed(reviews)]
+
+        response = admin_client.get(url, {'pagination': 'cursor', 'limit': 2})
+        assert response.status_code == HTTPStatus.OK
+        data = response.json()
+        assert set(data) == {'count', 'next', 'previous', 'results'}, (
+            'Проверьте, что в режиме курсорной пагинации формат ответа '
+            'совпадает с обычной пагинацией.'
+        )
+        assert data['previous'] is None
+        assert [item['id'] for item in data['results']] == expected_ids[:2]
+
+        response = admin_client.get(data['next'])
+        data = response.json()
+        assert [item['id'] for item in data['results']] == expected_ids[2:]
+        assert data['next'] is None
+
+        response = admin_client.get(data['previous'])
+        data = response.json()
+        assert [item['id'] for item in data['results']] == expected_ids[:2]
+        assert data['previous'] is None
+
+        response = admin_client.get(url, {'cursor': 'broken'})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_10_reviews_list_skips_title_lookup(self, client, admin_client,
+                                               admin, user_client, user):
+        author_map = {
+            admin: admin_client,
+            user: user_client
+        }
+        _, titles = create_reviews(admin_client, author_map)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == HTTPStatus.OK
+        assert not any(
+            'FROM "reviews_title"' in query['sql']
+            for query in context.captured_queries
+        ), (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` не '
+            'загружает произведение, если у него есть отзывы.'
+        )
+
+        response = client.get(
+            self.REVIEWS_URL_TEMPLATE.format(title_id=titles[1]['id'])
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.json()['count'] == 0
+
+        response = client.get(self.REVIEWS_URL_TEMPLATE.format(title_id=0))
+        assert response.status_code == HTTPStatus.NOT_FOUND, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` для '
+            'несуществующего произведения возвращает ответ со статусом 404.'
+        )
+
+        response = user_client.post(url, data={'text': 'Ещё раз', 'score': 3})
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            'Проверьте, что повторный отзыв на произведение отклоняется.'
+        )
+
+    @pytest.mark.parametrize('page_size', (10, 50, 100))
+    def test_11_reviews_list_query_count(self, client, page_size,
+                                         django_assert_num_queries):
+        title = Title.objects.create(name='Произведение', year=2000)
+        User.objects.bulk_create(
+            User(username=f'author_{idx}', email=f'author_{idx}@yamdb.fake')
+            for idx in range(page_size)
+        )
+        authors = User.objects.filter(username__startswith='author_')
+        Review.objects.bulk_create(
+            Review(title=title, author=author, text='Отзыв', score=5)
+            for author in authors
+        )
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+
+        # COUNT(*) для пагинации и страница отзывов вместе с авторами.
+        with django_assert_num_queries(2):
+            response = client.get(url, {'limit': page_size})
+        assert len(response.json()['results']) == page_size, (
+            f'Проверьте, что GET-запрос к `{self.REVIEWS_URL_TEMPLATE}` '
+            'выполняет фиксированное число SQL-запросов независимо от '
+            'размера страницы.'
+        )
+
+    def test_12_review_author_assigned_by_server(self, admin_client, admin,
+                                                 user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]['id'])
+        user_client.get(url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = user_client.post(
+                url,
+                data={'text': 'Отзыв', 'score': 7, 'author': admin.username}
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert response.json()['author'] == user.username, (
+            'Проверьте, что автором отзыва всегда становится автор запроса.'
+        )
+        assert not any(
+            'FROM "reviews_user"' in query['sql']
+            for query in context.captured_queries
+        ), (
+            f'Проверьте, что POST-запрос к `{self.REVIEWS_URL_TEMPLATE}` не '
+            'ищет автора в таблице пользователей.'
+        )
+
+    def test_13_reviews_bulk(self, admin_client, admin, user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        third = Title.objects.create(name='Третье', year=2000)
+        titles.append({'id': third.id})
+        create_single_review(user_client, titles[0]['id'], 'Отзыв', 4)
+        url = '/api/v1/reviews/bulk/'
+        data = [
+            {'title': titles[0]['id'], 'text': 'Первый', 'score': 6},
+            {'title': titles[1]['id'], 'text': 'Второй', 'score': 8},
+            {'title': titles[1]['id'], 'text': 'Повтор', 'score': 2},
+            {'title': 0, 'text': 'Нет произведения', 'score': 5},
+            {'title': titles[0]['id'], 'text': 'Оценка', 'score': 11},
+            {'title': titles[0]['id'], 'text': 'Уже есть', 'score': 3,
+             'author': user.username},
+        ]
+
+        response = admin_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.MULTI_STATUS, (
+            f'Проверьте, что POST-запрос к `{url}` с ошибками в части '
+            'элементов возвращает статус 207.'
+        )
+        statuses = [item['status'] for item in response.json()]
+        assert statuses == [201, 201, 400, 400, 400, 400], (
+            f'Проверьте, что POST-запрос к `{url}` возвращает статус '
+            'для каждого элемента: повторный отзыв того же автора, '
+            'несуществующее произведение и неверная оценка отклоняются.'
+        )
+        created = response.json()[0]['data']
+        assert created['author'] == admin.username and created['id'], (
+            f'Проверьте, что POST-запрос к `{url}` возвращает созданные '
+            'отзывы с id и автором запроса.'
+        )
+        for title, (score_sum, count) in zip(titles, ((10, 2), (8, 1))):
+            title = Title.objects.get(pk=title['id'])
+            assert (title.score_sum, title.reviews_count) == (
+                score_sum, count
+            ), (
+                f'Проверьте, что POST-запрос к `{url}` обновляет '
+                'рейтинг произведений.'
+            )
+
+        response = user_client.post(url, data=[
+            {'title': titles[2]['id'], 'text': 'Чужой', 'score': 5,
+             'author': admin.username}
+        ], format='json')
+        assert response.json()[0]['status'] == 400, (
+            f'Проверьте, что в POST-запросе к `{url}` автора может '
+            'указать только администратор.'
+        )
+        response = user_client.post(
+            url, data=[{'title': titles[2]['id'], 'text': 'Отзыв',
+                        'score': 5}] * 101, format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос к `{url}` ограничивает размер '
+            'пачки.'
+        )
+        assert not Review.objects.filter(title_id=titles[2]['id']).exists()
+
+    @pytest.mark.parametrize('size', (5, 50))
+    def test_14_reviews_bulk_query_count(self, admin_client, admin, size,
+                                         django_assert_num_queries):
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {idx}', year=2000)
+            for idx in range(size)
+        )
+        admin_client.get('/api/v1/users/me/')
+        data = [
+            {'title': title_id, 'text': 'Отзыв', 'score': 5}
+            for title_id in Title.objects.values_list('id', flat=True)
+        ]
+
+        # Произведения, существующие отзывы, начало транзакции, вставка,
+        # чтение ключей и обновление рейтинга — независимо от размера пачки.
+        with django_assert_num_queries(6):
+            response = admin_client.post(
+                '/api/v1/reviews/bulk/', data=data, format='json'
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert Review.objects.count() == size
+
+    def test_15_reviews_bulk_reports_conflicts(self, admin_client, admin,
+                                               monkeypatch, settings):
+        # Проверка пачки пропускает дубликат, как при гонке с другим
+        # запросом: его должна отвергнуть база. Повтор по одному элементу
+        # в лимит запросов маршрута не укладывается.
+        settings.QUERY_BUDGET_RAISE = False
+        monkeypatch.setattr(
+            ReviewBulkView, 'check_items', lambda self, items, errors: None
+        )
+        title = Title.objects.create(name='Произведение', year=2000)
+        other = Title.objects.create(name='Другое', year=2000)
+        response = admin_client.post('/api/v1/reviews/bulk/', data=[
+            {'title': title.id, 'text': 'Первый', 'score': 4},
+            {'title': title.id, 'text': 'Повтор', 'score': 10},
+            {'title': other.id, 'text': 'Другой', 'score': 8},
+        ], format='json')
+        assert response.status_code == HTTPStatus.MULTI_STATUS, (
+            'Проверьте, что при конфликте в базе пакетная загрузка '
+            'сохраняет остальные элементы и возвращает статус 207.'
+        )
+        results = response.json()
+        assert [item['status'] for item in results] == [201, 400, 201]
+        assert results[1]['errors'] == {'non_field_errors': [
+            ReviewBulkView.conflict_message
+        ]}
+        assert set(Review.objects.values_list('id', flat=True)) == {
+            results[0]['data']['id'], results[2]['data']['id']
+        }
+        assert list(Title.objects.order_by('pk').values_list(
+            'score_sum', 'reviews_count'
+        )) == [(4, 1), (8, 1)]
+
+    def test_16_review_create_keeps_other_integrity_errors(
+            self, user_client, monkeypatch, settings):
+        settings.QUERY_BUDGET_RAISE = False
+        title = Title.objects.create(name='Произведение', year=2000)
+
+        def broken_update(queryset, score_delta, count_delta=0):
+            raise IntegrityError('CHECK constraint failed: rating')
+
+        monkeypatch.setattr(TitleQuerySet, 'update_rating', broken_update)
+        with pytest.raises(IntegrityError):
+            user_client.post(
+                self.REVIEWS_URL_TEMPLATE.format(title_id=title.id),
+                data={'text': 'Отзыв', 'score': 5},
+            )
+        assert not Review.objects.exists(), (
+            'Проверьте, что ошибка базы, не связанная с повторным отзывом, '
+            'не превращается в ответ «Вы уже оставили отзыв».'
+        )
+
+    def test_17_review_rating_uses_locked_score(self, admin, user):
+        title = Title.objects.create(name='Произведение', year=2000)
+        review = Review.objects.create(
+            title=title, author=user, text='Отзыв', score=5
+        )
+        Title.objects.filter(pk=title.pk).update_rating(5, 1)
+        stale = [Review.objects.get(pk=review.pk) for _ in range(3)]
+        view = ReviewViewSet()
+
+        Review.objects.filter(pk=review.pk).update(score=2)
+        Title.objects.filter(pk=title.pk).update_rating(-3)
+        view.perform_destroy(stale[0])
+        title.refresh_from_db()
+        assert (title.score_sum, title.reviews_count) == (0, 0), (
+            'Проверьте, что при удалении отзыва рейтинг сдвигается на '
+            'оценку из базы, а не из устаревшего объекта.'
+        )
+
+        view.perform_destroy(stale[1])
+        title.refresh_from_db()
+        assert (title.score_sum, title.reviews_count) == (0, 0), (
+            'Проверьте, что повторное удаление уже удалённого отзыва не '
+            'меняет рейтинг произведения.'
+        )
+
+        serializer = ReviewSerializer(
+            stale[2], data={'score': 7}, partial=True,
+            context={'request': None}
+        )
+        assert serializer.is_valid(), serializer.errors
+        with pytest.raises(NotFound):
+            view.perform_update(serializer)
+        assert not Review.objects.exists(), (
+            'Проверьте, что изменение удалённого отзыва не создаёт его '
+            'заново.'
+        )
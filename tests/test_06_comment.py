@@ -1,6 +1,8 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from reviews.models import Comment, Review, Title, User
 
 from tests.utils import (check_fields, check_pagination, create_comments,
                          create_reviews, create_single_comment)
@@ -366,3 +368,100 @@ class Test06CommentAPI:
             f'Проверьте, что PUT-запрос к `{self.COMMENT_DETAIL_URL_TEMPLATE} '
             'не предусмотрен и возвращает статус 405.'
         )
+
+    @pytest.mark.parametrize('page_size', (10, 50, 100))
+    def test_08_comments_list_query_count(self, client, page_size,
+                                          django_assert_num_queries):
+        title = Title.objects.create(name='Произведение', year=2000)
+        User.objects.bulk_create(
+            User(username=f'author_{idx}', email=f'author_{idx}@yamdb.fake')
+            for idx in range(page_size)
+        )
+        authors = User.objects.filter(username__startswith='author_')
+        review = Review.objects.create(
+            title=title, author=authors[0], text='Отзыв', score=5
+        )
+        Comment.objects.bulk_create(
+            Comment(review=review, author=author, text='Комментарий')
+            for author in authors
+        )
+        url = self.COMMENTS_URL_TEMPLATE.format(
+            title_id=title.id, review_id=review.id
+        )
+
+        # COUNT(*) для пагинации и страница комментариев вместе с авторами.
+        with django_assert_num_queries(2):
+            response = client.get(url, {'limit': page_size})
+        assert len(response.json()['results']) == page_size, (
+            f'Проверьте, что GET-запрос к `{self.COMMENTS_URL_TEMPLATE}` '
+            'выполняет фиксированное число SQL-запросов независимо от '
+            'размера страницы.'
+        )
+
+    def test_09_comments_bulk(self, admin_client, admin, user_client, user):
+        reviews, titles = create_reviews(admin_client, {admin: admin_client})
+        url = '/api/v1/comments/bulk/'
+        data = [
+            {'review': reviews[0]['id'], 'text': 'Первый'},
+            {'review': 0, 'text': 'Нет отзыва'},
+            {'review': reviews[0]['id']},
+            {'review': reviews[0]['id'], 'text': 'Второй'},
+        ]
+
+        response = user_client.post(url, data=data, format='json')
+        assert response.status_code == HTTPStatus.MULTI_STATUS, (
+            f'Проверьте, что POST-запрос к `{url}` с ошибками в части '
+            'элементов возвращает статус 207.'
+        )
+        results = response.json()
+        assert [item['status'] for item in results] == [201, 400, 400, 201]
+        assert results[1]['errors'] == {'review': ['Отзыв не найден.']}
+        assert 'text' in results[2]['errors']
+        assert [
+            (item['data']['text'], item['data']['author'])
+            for item in (results[0], results[3])
+        ] == [('Первый', user.username), ('Второй', user.username)], (
+            f'Проверьте, что POST-запрос к `{url}` возвращает созданные '
+            'комментарии с автором запроса.'
+        )
+        assert set(
+            Comment.objects.values_list('id', flat=True)
+        ) == {results[0]['data']['id'], results[3]['data']['id']}
+
+        response = user_client.post(
+            url, data={'review': reviews[0]['id'], 'text': 'Один'},
+            format='json'
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            f'Проверьте, что POST-запрос к `{url}` принимает только список.'
+        )
+
+    def test_10_comments_bulk_single_insert(self, admin_client, admin,
+                                            user_client, monkeypatch):
+        reviews, _ = create_reviews(admin_client, {admin: admin_client})
+        calls = []
+
+        def bulk_create(objs):
+            # SQLite в Django 3.2 не возвращает ключи из bulk_create,
+            # поэтому вставка с возвратом ключей имитируется.
+            calls.append(len(objs))
+            for obj in objs:
+                obj.save(force_insert=True)
+            return objs
+
+        monkeypatch.setattr(
+            connection.features, 'can_return_rows_from_bulk_insert', True
+        )
+        monkeypatch.setattr(Comment.objects, 'bulk_create', bulk_create)
+        response = user_client.post('/api/v1/comments/bulk/', data=[
+            {'review': reviews[0]['id'], 'text': f'Комментарий {idx}'}
+            for idx in range(3)
+        ], format='json')
+        assert response.status_code == HTTPStatus.CREATED
+        assert calls == [3], (
+            'Проверьте, что на базе, возвращающей ключи вставленных строк, '
+            'пакет комментариев вставляется одним bulk_create.'
+        )
+        assert {
+            item['data']['id'] for item in response.json()
+        } == set(Comment.objects.values_list('id', flat=True))
@@ -0,0 +1,55 @@
+import pytest
+from api.filters import TitleFilter
+from api.views import (
+    CategoryViewSet, CommentViewSet, GenreViewSet, ReviewViewSet,
+    TitleViewSet, UsersViewSet
+)
+from django.db import connection
+
+VIEWSET_QUERYSETS = (
+    ('titles-list', lambda: TitleViewSet.queryset),
+    ('titles-list?year', lambda: TitleFilter(
+        data={'year': 2000}, queryset=TitleViewSet.queryset
+    ).qs),
+    ('titles-list?genre', lambda: TitleFilter(
+        data={'genre': 'drama'}, queryset=TitleViewSet.queryset
+    ).qs),
+    ('categories-list', lambda: CategoryViewSet.queryset),
+    ('genres-list', lambda: GenreViewSet.queryset),
+    ('reviews-list', lambda: ReviewViewSet(
+        kwargs={'title_id': 1}
+    ).get_queryset()),
+    ('reviews-list?cursor', lambda: ReviewViewSet(
+        kwargs={'title_id': 1}
+    ).get_queryset().order_by('-pub_date', '-id')),
+    ('comments-list', lambda: CommentViewSet(
+        kwargs={'title_id': 1, 'review_id': 1}
+    ).get_queryset()),
+    ('comments-list?cursor', lambda: CommentViewSet(
+        kwargs={'title_id': 1, 'review_id': 1}
+    ).get_queryset().order_by('-pub_date', '-id')),
+    ('users-list', lambda: UsersViewSet.queryset),
+)
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'sqlite',
+    reason='План запроса разбирается в формате EXPLAIN QUERY PLAN SQLite.'
+)
+@pytest.mark.django_db
+class Test08QueryPlans:
+
+    @pytest.mark.parametrize(
+        'route,get_queryset', VIEWSET_QUERYSETS,
+        ids=[route for route, _ in VIEWSET_QUERYSETS]
+    )
+    def test_01_viewset_queryset_uses_index(self, route, get_queryset):
+        plan = get_queryset()[:10].explain()
+        full_scans = [
+            line for line in plan.splitlines()
+            if 'SCAN ' in line and 'USING' not in line
+        ]
+        assert not (full_scans and 'TEMP B-TREE' in plan), (
+            f'Запрос `{route}` читает таблицу целиком и сортирует её во '
+            f'временном индексе. Добавьте подходящий индекс.\n{plan}'
+        )
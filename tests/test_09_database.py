@@ -0,0 +1,39 @@
+import pytest
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'sqlite',
+    reason='Проверяются настройки SQLite.'
+)
+@pytest.mark.django_db
+class Test09SqliteProfile:
+
+    def get_wrapper(self, name):
+        settings_dict = {**connection.settings_dict, 'NAME': str(name)}
+        wrapper_class = type(connections[DEFAULT_DB_ALIAS])
+        return wrapper_class(settings_dict, alias=DEFAULT_DB_ALIAS)
+
+    def test_01_pragmas_applied_to_new_connection(self, tmp_path):
+        wrapper = self.get_wrapper(tmp_path / 'profile.sqlite3')
+        pragmas = connection.settings_dict.get('PRAGMAS', {})
+        assert pragmas.get('journal_mode') == 'WAL', (
+            'Проверьте, что в настройках SQLite включён журнал WAL.'
+        )
+        try:
+            with wrapper.cursor() as cursor:
+                for name, expected in (
+                    ('journal_mode', 'wal'),
+                    ('synchronous', 1),
+                    ('busy_timeout', pragmas['busy_timeout']),
+                    ('mmap_size', pragmas['mmap_size']),
+                    ('cache_size', pragmas['cache_size']),
+                    ('temp_store', 2),
+                ):
+                    cursor.execute(f'PRAGMA {name}')
+                    assert cursor.fetchone()[0] == expected, (
+                        f'Проверьте, что PRAGMA {name} выполняется для '
+                        'каждого нового соединения с SQLite.'
+                    )
+        finally:
+            wrapper.close()
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+from api.async_views import (
+    ASYNC_READ_ROUTES, async_read_view, with_async_reads
+)
+from api.urls import v1_router
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.urls import resolve
+
+from tests.utils import create_comments
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10AsyncReads:
+
+    def call_async(self, method, url, **extra):
+        match = resolve(url.split('?')[0])
+        view = async_read_view(match.func)
+        request = getattr(RequestFactory(), method)(url, **extra)
+        response = async_to_sync(view)(request, *match.args, **match.kwargs)
+        return response
+
+    def test_01_async_read_matches_sync_json(self, client, admin_client,
+                                             admin, user_client, user):
+        comments, reviews, titles = create_comments(
+            admin_client, {admin: admin_client, user: user_client}
+        )
+        title_id, review_id = titles[0]['id'], reviews[0]['id']
+        for url in (
+            '/api/v1/titles/',
+            '/api/v1/titles/?limit=2&offset=1',
+            f'/api/v1/titles/{title_id}/',
+            f'/api/v1/titles/{title_id}/reviews/',
+            f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/',
+        ):
+            cache.clear()
+            response = self.call_async('get', url)
+            assert response.status_code == 200, (
+                f'Проверьте, что асинхронный GET-запрос к `{url}` '
+                'возвращает статус 200.'
+            )
+            cache.clear()
+            assert json.loads(response.content) == client.get(url).json(), (
+                f'Проверьте, что асинхронный GET-запрос к `{url}` '
+                'возвращает тот же JSON, что и синхронный.'
+            )
+
+    def test_02_async_view_delegates_writes(self, client, admin_client):
+        response = self.call_async(
+            'post', '/api/v1/titles/', data={'name': 'Новое', 'year': 2000},
+            content_type='application/json'
+        )
+        assert response.status_code == 401, (
+            'Проверьте, что POST-запрос через асинхронное представление '
+            'проверяет права так же, как синхронный.'
+        )
+
+    def test_03_only_read_routes_wrapped(self):
+        patterns = with_async_reads(v1_router.urls)
+        wrapped = {
+            pattern.name for pattern in patterns
+            if asyncio.iscoroutinefunction(pattern.callback)
+        }
+        assert wrapped == set(ASYNC_READ_ROUTES), (
+            'Проверьте, что асинхронными становятся только маршруты '
+            f'{", ".join(ASYNC_READ_ROUTES)}.'
+        )
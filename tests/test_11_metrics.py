@@ -0,0 +1,84 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+from api.middleware import (
+    QueryBudgetExceeded, QueryMetricsMiddleware, TraceCaptureMiddleware
+)
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory
+from reviews.models import Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11QueryMetrics:
+
+    STATS_URL = '/api/v1/stats/'
+    TITLES_URL = '/api/v1/titles/'
+
+    def test_01_stats_admin_only(self, client, user_client, admin_client):
+        Title.objects.create(name='Произведение', year=2000)
+        client.get(self.TITLES_URL)
+
+        assert client.get(self.STATS_URL).status_code == (
+            HTTPStatus.UNAUTHORIZED
+        )
+        assert user_client.get(self.STATS_URL).status_code == (
+            HTTPStatus.FORBIDDEN
+        ), f'Проверьте, что `{self.STATS_URL}` доступен только админу.'
+        response = admin_client.get(self.STATS_URL)
+        assert response.status_code == HTTPStatus.OK
+        titles = response.json().get('titles-list')
+        assert titles is not None, (
+            f'Проверьте, что `{self.STATS_URL}` собирает метрики по '
+            'имени маршрута.'
+        )
+        assert titles['queries']['count'] == 1
+        assert titles['queries']['sum'] == 3
+        assert titles['serializer_ms']['sum'] > 0
+        assert titles['view_ms']['sum'] >= titles['db_ms']['sum'] > 0
+
+    def test_02_metrics_header(self, client, settings):
+        response = client.get(self.TITLES_URL)
+        assert 'X-Query-Count' not in response
+        settings.QUERY_METRICS_HEADER = True
+        response = client.get(self.TITLES_URL, {'limit': 5})
+        assert int(response['X-Query-Count']) > 0, (
+            'Проверьте, что при QUERY_METRICS_HEADER ответ содержит '
+            'число SQL-запросов.'
+        )
+        assert 'view;dur=' in response['Server-Timing']
+
+    def test_03_query_budget(self, client, settings, caplog):
+        settings.QUERY_BUDGETS = {'GET titles-list': 0}
+        with pytest.raises(QueryBudgetExceeded):
+            client.get(self.TITLES_URL)
+
+        settings.QUERY_BUDGET_RAISE = False
+        response = client.get(self.TITLES_URL)
+        assert response.status_code == HTTPStatus.OK
+        assert 'titles-list' in caplog.text, (
+            'Проверьте, что превышение лимита SQL-запросов пишется в лог.'
+        )
+
+    def test_04_middleware_async_capable(self, settings, tmp_path):
+        settings.TRACE_CAPTURE_PATH = str(tmp_path / 'trace.jsonl')
+
+        async def get_response(request):
+            return HttpResponse('ok')
+
+        for middleware_class in (QueryMetricsMiddleware,
+                                 TraceCaptureMiddleware):
+            assert not asyncio.iscoroutinefunction(
+                middleware_class(lambda request: HttpResponse('ok'))
+            )
+            middleware = middleware_class(get_response)
+            assert asyncio.iscoroutinefunction(middleware), (
+                f'Проверьте, что {middleware_class.__name__} с асинхронным '
+                'get_response распознаётся Django как асинхронный.'
+            )
+            request = RequestFactory().get(self.TITLES_URL)
+            request.resolver_match = None
+            response = async_to_sync(middleware)(request)
+            assert response.content == b'ok'
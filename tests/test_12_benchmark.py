@@ -0,0 +1,87 @@
+import json
+from io import StringIO
+
+import pytest
+from api import urls
+from api.management.commands.bench_api import route_names
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from reviews.models import Comment, Review, Title, User
+from reviews.validators import validate_username
+
+
+@pytest.mark.django_db
+class Test12Benchmark:
+
+    def test_01_bench_api_covers_every_route(self, tmp_path):
+        titles = Title.objects.count()
+        output = tmp_path / 'bench.json'
+        call_command(
+            'bench_api', '--rollback', '--titles', 3, '--genres', 2,
+            '--categories', 2, '--users', 3, '--reviews-per-title', 2,
+            '--comments-per-review', 1, '--requests', 2, '--warmup', 1,
+            '--json', str(output),
+        )
+        report = json.loads(output.read_text(encoding='utf-8'))
+        assert report['uncovered'] == [], (
+            'Проверьте, что у каждого маршрута api/urls.py есть сценарий.'
+        )
+        assert {
+            result['route'] for result in report['results']
+        } == route_names(urls.urlpatterns)
+        for result in report['results']:
+            assert result['errors'] == 0, (
+                f'{result["method"]} {result["route"]} отвечает ошибкой.'
+            )
+            assert 0 < result['p50_ms'] <= result['p95_ms'] <= (
+                result['p99_ms']
+            )
+            assert result['sequential_rps'] > 0
+        assert report['dataset']['titles'] == 3
+        assert Title.objects.count() == titles, (
+            'Проверьте, что в режиме --rollback данные замера откатываются.'
+        )
+        assert not Review.objects.exists()
+        assert not User.objects.filter(username__startswith='bench_').exists()
+
+    def test_02_generate_data_skew_and_constraints(self):
+        call_command(
+            'generate_data', '--users', 40, '--titles', 30,
+            '--categories', 3, '--genres', 5, '--reviews', 300,
+            '--comments-per-review', 1.5, '--batch-size', 7,
+            '--prefix', 'test', stdout=StringIO(),
+        )
+        users = User.objects.filter(username__startswith='test_')
+        assert users.count() == 40
+        for username in users.values_list('username', flat=True):
+            validate_username(username)
+        titles = Title.objects.filter(category__slug__startswith='test-')
+        assert titles.count() == 30
+        assert not titles.with_rating_drift().exists(), (
+            'Проверьте, что generate_data заполняет рейтинг произведений.'
+        )
+        counts = list(
+            titles.order_by('pk').values_list('reviews_count', flat=True)
+        )
+        assert counts[0] == max(counts) > counts[len(counts) // 2], (
+            'Проверьте, что число отзывов убывает по закону Ципфа.'
+        )
+        assert max(counts) <= 40
+        assert not Review.objects.values('title', 'author').annotate(
+            total=Count('id')
+        ).filter(total__gt=1).exists()
+        commenters = list(
+            Comment.objects.values('author').annotate(total=Count('id'))
+            .order_by('-total').values_list('total', flat=True)
+        )
+        assert commenters[0] > 3 * commenters[-1], (
+            'Проверьте, что авторы комментариев распределены неравномерно.'
+        )
+        # Ключи назначены явно: последовательности должны быть сдвинуты.
+        Title.objects.create(name='После генерации', year=2000)
+        User.objects.create(username='after_generation', email='a@a.ru')
+        with pytest.raises(CommandError):
+            call_command(
+                'generate_data', '--users', 1, '--titles', 1,
+                '--prefix', 'test', stdout=StringIO(),
+            )
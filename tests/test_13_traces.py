@@ -0,0 +1,141 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from api.management.commands.replay_traces import read_trace
+from api.traces import (
+    MASK, TraceWriter, get_trace_writer, process_trace_path
+)
+from django.core.management import call_command
+from reviews.models import Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13Traces:
+
+    TITLES_URL = '/api/v1/titles/'
+
+    def capture(self, settings, tmp_path, *requests):
+        path = str(tmp_path / 'trace.jsonl')
+        settings.TRACE_CAPTURE_PATH = path
+        for client, url, params in requests:
+            client.get(url, params)
+        get_trace_writer(path, settings.TRACE_BUFFER_SIZE).flush()
+        with open(process_trace_path(path), encoding='utf-8') as file:
+            return path, [json.loads(line) for line in file]
+
+    def test_01_capture_sanitized_records(self, client, user_client,
+                                          settings, tmp_path):
+        title = Title.objects.create(name='Произведение', year=2000)
+        _, entries = self.capture(
+            settings, tmp_path,
+            (client, self.TITLES_URL, {'search': 'произв', 'token': 'x'}),
+            (client, f'{self.TITLES_URL}{title.pk}/', {}),
+            (user_client, '/api/v1/users/me/', {}),
+            (client, '/api/v1/unknown/', {}),
+        )
+        assert [entry['route'] for entry in entries] == [
+            'titles-list', 'titles-detail', 'users-me'
+        ], 'Проверьте, что в трассу пишутся запросы к известным маршрутам.'
+        titles, detail, me = entries
+        assert titles['method'] == 'GET'
+        assert titles['status'] == HTTPStatus.OK
+        assert titles['params'] == {'search': ['произв'], 'token': MASK}, (
+            'Проверьте, что секреты в параметрах запроса маскируются.'
+        )
+        assert titles['queries'] > 0
+        assert titles['latency_ms'] > 0
+        assert detail['kwargs'] == {'pk': str(title.pk)}
+        assert detail['path'] == f'{self.TITLES_URL}{title.pk}/'
+        assert me['authenticated'] and not titles['authenticated']
+        assert 'Bearer' not in json.dumps(entries), (
+            'Проверьте, что токены не попадают в трассу.'
+        )
+
+    def test_02_capture_disabled_by_default(self, client, settings,
+                                            tmp_path):
+        assert not settings.TRACE_CAPTURE_PATH
+        client.get(self.TITLES_URL)
+        assert not list(tmp_path.iterdir())
+
+    def test_03_replay_traces(self, client, user_client, token_user,
+                              settings, tmp_path, live_server):
+        Title.objects.create(name='Произведение', year=2000)
+        path, _ = self.capture(
+            settings, tmp_path,
+            (client, self.TITLES_URL, {'limit': 5}),
+            (client, self.TITLES_URL, {}),
+            (user_client, '/api/v1/users/me/', {}),
+            (client, '/api/v1/unknown/', {}),
+        )
+        user_client.post(
+            '/api/v1/categories/', {'name': 'Категория', 'slug': 'category'}
+        )
+        get_trace_writer(path, settings.TRACE_BUFFER_SIZE).flush()
+        settings.TRACE_CAPTURE_PATH = ''
+        output = tmp_path / 'replay.json'
+        call_command(
+            'replay_traces', path, '--base-url', live_server.url,
+            '--speedup', 0, '--concurrency', 2, '--json', str(output),
+        )
+        report = json.loads(output.read_text(encoding='utf-8'))
+        assert report['replayed'] == 2 and report['skipped'] == 2, (
+            'Проверьте, что без токена повторяются только анонимные чтения.'
+        )
+        routes = {route['route']: route for route in report['routes']}
+        assert routes['GET titles-list']['count'] == 2
+        assert routes['GET titles-list']['status_mismatches'] == 0
+        assert routes['GET titles-list']['replayed']['p95_ms'] > 0
+
+        call_command(
+            'replay_traces', path, '--base-url', live_server.url,
+            '--token', token_user['access'], '--json', str(output),
+        )
+        report = json.loads(output.read_text(encoding='utf-8'))
+        assert report['replayed'] == 3
+        me = next(
+            route for route in report['routes']
+            if route['route'] == 'GET users-me'
+        )
+        assert me['status_mismatches'] == 0
+
+    def test_04_writer_survives_errors(self, tmp_path, caplog):
+        directory = tmp_path / 'trace.jsonl'
+        directory.mkdir()
+        writer = TraceWriter(str(directory), 10)
+        writer.record({'n': 1})
+        writer.flush()
+        assert writer.thread.is_alive() and writer.failed == 1, (
+            'Проверьте, что ошибка записи трассы не останавливает поток.'
+        )
+        directory.rmdir()
+
+        writer.record({'n': 2, 'bad': object()})
+        writer.record({'n': 3})
+        writer.dropped = 4
+        writer.flush()
+        writer.close()
+        lines = directory.read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line) for line in lines] == [{'n': 3}]
+        assert writer.failed == 2
+        assert 'отброшено записей 4' in caplog.text, (
+            'Проверьте, что о переполнении очереди трассы сообщается в лог.'
+        )
+
+    def test_05_replay_merges_process_files(self, tmp_path):
+        path = tmp_path / 'trace.jsonl'
+        for pid, stamps in ((101, (1, 4)), (202, (2, 3))):
+            (tmp_path / f'trace.{pid}.jsonl').write_text(''.join(
+                json.dumps({'ts': ts, 'method': 'GET'}) + '\n'
+                for ts in stamps
+            ) + 'обрыв строки', encoding='utf-8')
+        (tmp_path / 'other.1.jsonl').write_text(
+            json.dumps({'ts': 0}) + '\n', encoding='utf-8'
+        )
+
+        entries = read_trace(str(path))
+        assert [entry['ts'] for entry in entries] == [1, 2, 3, 4], (
+            'Проверьте, что replay_traces читает файлы всех процессов '
+            'и упорядочивает записи по времени.'
+        )
+        assert [entry['ts'] for entry in read_trace(str(path), 2)] == [1, 2]
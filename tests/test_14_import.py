@@ -0,0 +1,179 @@
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+from importlib import import_module
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from reviews.models import Category, Comment, Review, Title, User
+from reviews.validators import validate_year
+
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent / 'api_yamdb'
+CREATED_AT_COLUMNS = {'pub_date', 'date_joined', 'created_at'}
+
+
+def manage(database, *args):
+    """manage.py в отдельном процессе с базой SQLite в файле database."""
+    subprocess.run(
+        [sys.executable, 'manage.py', *args], cwd=PROJECT_DIR, check=True,
+        env={**os.environ, 'DB_ENGINE': 'sqlite3', 'SQLITE_PATH': database},
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def dump_tables(database):
+    """Строки таблиц приложения без времени создания: оно у запусков разное."""
+    dump = {}
+    with sqlite3.connect(database) as connection:
+        tables = [name for name, in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name LIKE 'reviews_%' ORDER BY name"
+        )]
+        for table in tables:
+            columns = ', '.join(
+                row[1] for row in connection.execute(
+                    f'PRAGMA table_info({table})'
+                ) if row[1] not in CREATED_AT_COLUMNS
+            )
+            dump[table] = connection.execute(
+                f'SELECT {columns} FROM {table} ORDER BY 1'
+            ).fetchall()
+    return dump
+
+
+def import_command():
+    command = import_module('api.management.commands.import').Command()
+    command.ids = {}
+    return command
+
+
+@pytest.mark.django_db(transaction=True)
+class Test14Import:
+
+    def test_01_reports_every_invalid_year(self, tmp_path, capsys):
+        path = tmp_path / 'titles.csv'
+        path.write_text(
+            'id,name,year\n'
+            '1,Прошлое,1999\n'
+            '2,Будущее,9998\n'
+            '3,Настоящее,2001\n'
+            '4,Далёкое будущее,9999\n',
+            encoding='utf-8'
+        )
+        command = import_command()
+
+        rows, successful = command.import_table(path, Title, 100, 100)
+        output = capsys.readouterr().out
+        assert (rows, successful) == (4, 2)
+        assert 'строке 2' in output and 'строке 4' in output, (
+            'Проверьте, что команда import сообщает о каждой строке с '
+            'годом больше текущего.'
+        )
+        assert set(Title.objects.values_list('id', flat=True)) == {1, 3}
+
+    def test_02_batch_validator_disagreement(self, capsys):
+        # Пакетная проверка отвергла значение, которое одиночный
+        # валидатор пропускает: строка всё равно отбрасывается.
+        rows = [{'id': 1, 'year': 2000}, {'id': 2, 'year': 2001}]
+        batch_validators = [
+            (Title._meta.get_field('year'), validate_year, lambda years: [0])
+        ]
+
+        valid = import_command().validate_chunk(rows, batch_validators)
+        assert valid == [{'id': 2, 'year': 2001}]
+        assert 'строке 1' in capsys.readouterr().out, (
+            'Проверьте, что команда import сообщает о строке, отвергнутой '
+            'пакетной проверкой, даже если одиночный валидатор её пропускает.'
+        )
+
+    def test_03_multiple_chunks(self, tmp_path):
+        path = tmp_path / 'category.csv'
+        path.write_text('id,name,slug\n' + ''.join(
+            f'{index},Категория {index},category-{index}\n'
+            for index in range(1, 8)
+        ), encoding='utf-8')
+        command = import_command()
+        chunks = []
+        save_chunk = command.save_chunk
+
+        def spy(model, objects, batch_size):
+            chunks.append(len(objects))
+            return save_chunk(model, objects, batch_size)
+
+        command.save_chunk = spy
+        assert command.import_table(path, Category, 3, 2) == (7, 7)
+        assert chunks == [3, 3, 1], (
+            'Проверьте, что команда import читает csv пачками по '
+            '--chunk-size строк.'
+        )
+        assert list(
+            Category.objects.order_by('pk').values_list('pk', flat=True)
+        ) == list(range(1, 8))
+
+        assert import_command().import_table(path, Category, 3, 2) == (
+            7, 0
+        ), 'Проверьте, что повторный импорт пропускает загруженные строки.'
+        assert Category.objects.count() == 7
+
+    def test_04_row_fallback_after_integrity_error(self, tmp_path, capsys):
+        path = tmp_path / 'category.csv'
+        path.write_text(
+            'id,name,slug\n'
+            '1,Фильм,movie\n'
+            '2,Кино,movie\n'
+            '3,Книга,book\n',
+            encoding='utf-8'
+        )
+
+        rows, successful = import_command().import_table(
+            path, Category, 100, 100
+        )
+        assert (rows, successful) == (3, 2), (
+            'Проверьте, что при ошибке базы команда import сохраняет пачку '
+            'построчно и пропускает только ошибочные строки.'
+        )
+        assert 'строке 2' in capsys.readouterr().out
+        assert set(Category.objects.values_list('slug', flat=True)) == {
+            'movie', 'book'
+        }
+
+    def test_05_rerun_is_idempotent(self, monkeypatch, capsys):
+        monkeypatch.chdir(PROJECT_DIR)
+        models = (Category, Title, User, Review, Comment)
+        call_command('import', '--chunk-size', 10, '--batch-size', 4)
+        counts = [model.objects.count() for model in models]
+        assert all(counts)
+        ratings = Title.objects.order_by('pk').values_list(
+            'score_sum', 'reviews_count'
+        )
+        before = list(ratings)
+
+        call_command('import')
+        assert [model.objects.count() for model in models] == counts, (
+            'Проверьте, что повторный запуск import не дублирует данные.'
+        )
+        assert list(ratings.all()) == before
+        assert 'Ошибка' not in capsys.readouterr().out
+        # Последовательности ключей сдвинуты после вставки с явными id.
+        Category.objects.create(name='После импорта', slug='after-import')
+
+    def test_06_parallel_import_matches_serial(self, tmp_path):
+        # Рабочим процессам нужна база в файле: тестовая в памяти
+        # им не видна.
+        serial = str(tmp_path / 'serial.sqlite3')
+        parallel = str(tmp_path / 'parallel.sqlite3')
+        manage(serial, 'migrate')
+        shutil.copyfile(serial, parallel)
+
+        manage(serial, 'import')
+        manage(parallel, 'import', '--workers', '2')
+        tables = dump_tables(serial)
+        assert tables['reviews_review'] and tables['reviews_comment']
+        assert dump_tables(parallel) == tables, (
+            'Проверьте, что import с --workers загружает те же строки, '
+            'что и последовательный.'
+        )